@@ -0,0 +1,135 @@
+import os
+import socket
+import time
+import uuid
+
+import jobs
+import navigation
+import tab_pool
+
+
+class CrawlRunner:
+    """
+    Works through the unvisited URLs of a url_store.UrlStore.
+    URLs are leased from the store one at a time as tabs free up, so
+    several runners (e.g. one job per pool worker) can share a list.
+    Every outcome is committed to the store right away. Failures are
+    retried with exponential backoff, and URLs that keep failing are
+    parked as dead letters. A URL is marked visited only after commit()
+    (e.g. a sink flush) has made fn's output durable, so a crash never
+    leaves a visited URL whose result was lost. With a navigation
+    profile (see navigation.py) the crawl tabs skip the resources it
+    blocks. Nothing here reads stdin: a crashed or cancelled run is resumed by starting it again.
+    """
+
+    def __init__(
+        self,
+        store,
+        fn,
+        tabs: int = 3,
+        max_attempts: int = 4,
+        backoff_base: float = 5.0,
+        backoff_max: float = 300.0,
+        lease_seconds: float = 600.0,
+        page_timeout: float = 30.0,
+        checkpoint=None,
+        checkpoint_every: int = 25,
+        profile: str = None,
+        commit=None,
+    ):
+        self.store = store
+        self.fn = fn
+        self.tabs = max(1, int(tabs))
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.page_timeout = page_timeout
+        self.checkpoint = checkpoint
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self.profile = profile
+        self.commit = commit
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stats = {"done": 0, "failed": 0, "dead": 0}
+
+    def _leased_urls(self):
+        while True:
+            jobs.check_cancelled()
+            urls = self.store.lease(self.owner, 1, self.lease_seconds)
+            if not urls:
+                return
+            yield urls[0]
+
+    def _sleep(self, seconds: float):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            jobs.check_cancelled()
+            time.sleep(min(0.5, max(0.0, deadline - time.time())))
+
+    def _prepare_tab(self, driver):
+        navigation.apply_profile(driver, self.profile)
+
+    def _checkpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint()
+
+    def _record(self, url, error):
+        if error is None and self.commit is not None:
+            try:
+                self.commit()
+            except Exception as e:
+                error = Exception(f"Could not commit result: {e}")
+        if error is None:
+            self.store.mark_visited(url)
+            self.stats["done"] += 1
+            print(f"[crawl] done: {url}")
+            return
+        outcome = self.store.fail(
+            url,
+            str(error),
+            max_attempts=self.max_attempts,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+        )
+        if outcome["dead"]:
+            self.stats["dead"] += 1
+            print(f"[crawl] dead letter after {outcome['attempts']} attempts: {url} ({error})")
+        else:
+            self.stats["failed"] += 1
+            print(f"[crawl] attempt {outcome['attempts']} failed, retry in {outcome['retry_in']:.0f}s: {url} ({error})")
+
+    def run(self, driver):
+        """
+        Runs until every URL is visited or dead (or the job is cancelled).
+        fn(driver, url) is called in a tab whose page has finished loading;
+        any exception counts as a failed attempt. Returns the run stats.
+        """
+        reclaimed = self.store.reclaim_orphaned_leases()
+        if reclaimed:
+            print(f"[crawl] Reclaimed {reclaimed} URL(s) leased by a runner that is gone")
+        processed = 0
+        try:
+            while True:
+                for url, _result, error in tab_pool.map_urls(
+                    driver,
+                    self._leased_urls(),
+                    self.fn,
+                    tabs=self.tabs,
+                    timeout=self.page_timeout,
+                    prepare=self._prepare_tab if self.profile else None,
+                ):
+                    self._record(url, error)
+                    processed += 1
+                    if processed % self.checkpoint_every == 0:
+                        self._checkpoint()
+                wait = self.store.next_due_in()
+                if wait is None:
+                    break
+                if wait > 0:
+                    print(f"[crawl] Waiting {wait:.0f}s for the next retry")
+                    self._sleep(wait)
+        finally:
+            self.store.release(self.owner)
+            self._checkpoint()
+        print(f"[crawl] Finished: {self.stats} {self.store.counts()}")
+        return dict(self.stats)
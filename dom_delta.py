@@ -0,0 +1,222 @@
+import os
+
+
+DEFAULT_MAX_RECORDS = 5000
+DEFAULT_MAX_BYTES = 1_000_000
+
+_INSTALL_JS = """
+var maxRecords = arguments[0], maxBytes = arguments[1];
+var state = window.__bfDelta;
+if (state && state.observer) { return {installed: true, fresh: false}; }
+
+function pathOf(node) {
+  if (node && node.nodeType !== 1) { node = node.parentNode; }
+  var parts = [];
+  while (node && node.nodeType === 1 && parts.length < 12) {
+    if (node.id) { parts.unshift('#' + CSS.escape(node.id)); break; }
+    var tag = node.tagName.toLowerCase();
+    var parent = node.parentNode;
+    if (!parent || parent.nodeType !== 1) { parts.unshift(tag); break; }
+    var idx = 1, sib = node;
+    while ((sib = sib.previousElementSibling)) { if (sib.tagName === node.tagName) { idx++; } }
+    parts.unshift(tag + ':nth-of-type(' + idx + ')');
+    node = parent;
+  }
+  return parts.join(' > ');
+}
+
+function describe(node, limit) {
+  if (node.nodeType === 3) { return {text: (node.textContent || '').slice(0, limit)}; }
+  if (node.nodeType !== 1) { return null; }
+  var tag = node.tagName.toLowerCase();
+  if (tag === 'script' || tag === 'style' || tag === 'noscript') { return {tag: tag}; }
+  return {tag: tag, html: (node.outerHTML || '').slice(0, limit)};
+}
+
+function ignored(node) {
+  var el = node && node.nodeType === 1 ? node : node && node.parentNode;
+  return !!(el && el.closest && el.closest('script, style, noscript'));
+}
+
+state = window.__bfDelta = {
+  seq: 0,
+  childList: [],
+  attributes: {},
+  text: {},
+  bytes: 0,
+  count: 0,
+  overflow: false,
+  installedAt: Date.now(),
+  url: location.href
+};
+
+function account(size) {
+  state.count += 1;
+  state.bytes += size;
+  if (state.count > maxRecords || state.bytes > maxBytes) { state.overflow = true; }
+}
+
+// Kept on state so collect can feed it records not yet delivered.
+state.handle = function (mutations) {
+  if (state.overflow) { return; }
+  for (var i = 0; i < mutations.length; i++) {
+    var m = mutations[i];
+    if (ignored(m.target)) { continue; }
+    state.seq += 1;
+    if (m.type === 'childList') {
+      var rec = {seq: state.seq, path: pathOf(m.target), added: [], removed: []};
+      var size = 0, j, d;
+      for (j = 0; j < m.addedNodes.length; j++) {
+        d = describe(m.addedNodes[j], 2000);
+        if (d) { rec.added.push(d); size += (d.html || d.text || '').length; }
+      }
+      for (j = 0; j < m.removedNodes.length; j++) {
+        d = describe(m.removedNodes[j], 300);
+        if (d) { rec.removed.push(d); size += (d.html || d.text || '').length; }
+      }
+      if (!rec.added.length && !rec.removed.length) { continue; }
+      state.childList.push(rec);
+      account(size + rec.path.length);
+    } else if (m.type === 'attributes') {
+      var path = pathOf(m.target);
+      var key = path + '@' + m.attributeName;
+      var value = m.target.getAttribute(m.attributeName);
+      var prev = state.attributes[key];
+      // Repeated changes to one attribute collapse into first old -> latest value.
+      state.attributes[key] = {
+        seq: state.seq, path: path, name: m.attributeName,
+        old: prev ? prev.old : m.oldValue, value: value
+      };
+      if (!prev) { account(key.length + (value || '').length); }
+    } else if (m.type === 'characterData') {
+      var tpath = pathOf(m.target);
+      var tprev = state.text[tpath];
+      var text = (m.target.textContent || '').slice(0, 2000);
+      state.text[tpath] = {seq: state.seq, path: tpath, old: tprev ? tprev.old : m.oldValue, text: text};
+      if (!tprev) { account(tpath.length + text.length); }
+    }
+  }
+};
+state.observer = new MutationObserver(state.handle);
+state.observer.observe(document.documentElement, {
+  childList: true, subtree: true,
+  attributes: true, attributeOldValue: true,
+  characterData: true, characterDataOldValue: true
+});
+return {installed: true, fresh: true};
+"""
+
+_COLLECT_JS = """
+var state = window.__bfDelta;
+if (!state || !state.observer) { return {installed: false, url: location.href}; }
+// Mutations made just before this call are queued but not yet delivered.
+if (state.handle) { state.handle(state.observer.takeRecords()); }
+var out = {
+  installed: true,
+  url: location.href,
+  since: state.installedAt,
+  overflow: state.overflow,
+  count: state.count,
+  bytes: state.bytes,
+  childList: state.childList,
+  attributes: Object.keys(state.attributes).map(function (k) { return state.attributes[k]; }),
+  text: Object.keys(state.text).map(function (k) { return state.text[k]; })
+};
+state.childList = [];
+state.attributes = {};
+state.text = {};
+state.bytes = 0;
+state.count = 0;
+state.overflow = false;
+state.installedAt = Date.now();
+return out;
+"""
+
+_UNINSTALL_JS = """
+var state = window.__bfDelta;
+if (state && state.observer) { state.observer.disconnect(); }
+delete window.__bfDelta;
+"""
+
+
+def install(driver, max_records: int = DEFAULT_MAX_RECORDS, max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    Installs the MutationObserver in the current page (no-op if present).
+    Past max_records / max_bytes the observer stops recording and the next
+    checkpoint falls back to a full snapshot.
+    """
+    return driver.execute_script(_INSTALL_JS, int(max_records), int(max_bytes))
+
+
+def uninstall(driver):
+    driver.execute_script(_UNINSTALL_JS)
+
+
+def _full_snapshot(driver, filename, snapshot_dir):
+    import save_dom
+
+    kwargs = {"filename": filename}
+    if snapshot_dir is not None:
+        kwargs["snapshot_dir"] = snapshot_dir
+    return save_dom.save_page_dom_to_file(driver, **kwargs)
+
+
+def checkpoint(
+    driver,
+    filename: str = "page_dom.txt",
+    snapshot_dir=None,
+    max_records: int = DEFAULT_MAX_RECORDS,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+):
+    """
+    Returns the DOM mutations since the previous checkpoint and starts a new one.
+    Falls back to a full snapshot (page_dom.txt + snapshot store) when there
+    is no baseline yet (first call, or the page navigated since) or when
+    the delta outgrew max_records / max_bytes. The observer is (re)installed
+    right after a full snapshot, so the next call returns a delta against it.
+    """
+    collected = driver.execute_script(_COLLECT_JS)
+    reason = None
+    if not collected.get("installed"):
+        reason = "no_baseline"
+    elif collected.get("overflow"):
+        reason = "delta_too_large"
+
+    if reason is None:
+        return {
+            "mode": "delta",
+            "url": collected.get("url"),
+            "since_ms": collected.get("since"),
+            "count": collected.get("count"),
+            "bytes": collected.get("bytes"),
+            "child_list": collected.get("childList") or [],
+            "attributes": collected.get("attributes") or [],
+            "text": collected.get("text") or [],
+        }
+
+    # Install first so nothing between the snapshot and the observer is lost;
+    # a few duplicate records are harmless, a gap is not.
+    uninstall(driver)
+    install(driver, max_records=max_records, max_bytes=max_bytes)
+    snapshot = _full_snapshot(driver, filename, snapshot_dir)
+    return {
+        "mode": "full",
+        "reason": reason,
+        "url": collected.get("url"),
+        "page_dom_path": os.path.abspath(filename),
+        "snapshot": snapshot,
+    }
+
+
+def main(driver, payload=None):
+    """
+    Bot-safe entry point: returns the DOM delta since the last call
+    (or a full snapshot when needed).
+    """
+    payload = payload or {}
+    return checkpoint(
+        driver,
+        filename=payload.get("filename") or "page_dom.txt",
+        max_records=int(payload.get("max_records") or DEFAULT_MAX_RECORDS),
+        max_bytes=int(payload.get("max_bytes") or DEFAULT_MAX_BYTES),
+    )
@@ -0,0 +1,238 @@
+import re
+from html import escape
+from html.parser import HTMLParser
+
+
+# Subtrees that never help an LLM write selectors.
+DROP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "object", "embed", "link", "meta", "base",
+}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+# Elements worth keeping even when empty and attribute-less.
+KEEP_EMPTY_TAGS = VOID_TAGS | {"button", "select", "textarea", "option", "td", "th", "a"}
+KEEP_ATTRS = {
+    "id", "name", "class", "role", "href",
+    "type", "placeholder", "value", "alt", "title", "for", "src",
+}
+KEEP_ATTR_PREFIXES = ("aria-", "data-")
+# Start tag -> open elements it closes implicitly (<li><li>, <p><p>, <tr><td><tr>).
+IMPLIED_END = {
+    "li": {"li"},
+    "p": {"p"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "option": {"option"},
+    "tr": {"tr", "td", "th"},
+    "td": {"td", "th"},
+    "th": {"td", "th"},
+}
+CHARS_PER_TOKEN = 4
+
+# Progressively stricter settings, tried in order until the budget fits.
+_LEVELS = (
+    {"keep_siblings": 3, "max_text": 300, "max_attr": 120},
+    {"keep_siblings": 2, "max_text": 120, "max_attr": 80},
+    {"keep_siblings": 1, "max_text": 60, "max_attr": 40},
+)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _clip(value: str, limit: int):
+    if len(value) <= limit:
+        return value
+    return value[:limit] + "…"
+
+
+class _Frame:
+    __slots__ = ("tag", "start", "has_attrs", "signatures", "hidden")
+
+    def __init__(self, tag, start, has_attrs):
+        self.tag = tag
+        self.start = start
+        self.has_attrs = has_attrs
+        self.signatures = {}
+        self.hidden = {}
+
+
+class _Reducer(HTMLParser):
+    def __init__(self, keep_siblings: int, max_text: int, max_attr: int):
+        super().__init__(convert_charrefs=True)
+        self.keep_siblings = keep_siblings
+        self.max_text = max_text
+        self.max_attr = max_attr
+        self.out = []
+        self.stack = [_Frame(None, 0, True)]
+        self.skip_depth = 0
+        self.skip_tag = None
+        self.in_head = False
+
+    def _attrs(self, attrs):
+        kept = []
+        for name, value in attrs:
+            if name in KEEP_ATTRS or name.startswith(KEEP_ATTR_PREFIXES):
+                value = _WS_RE.sub(" ", value or "").strip()
+                if name == "src" and value.startswith("data:"):
+                    value = "data:…"
+                kept.append((name, _clip(value, self.max_attr)))
+        return kept
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth == 1 and self.skip_tag in IMPLIED_END.get(tag, ()):
+            # The skipped sibling ends where the next one opens (unclosed <li>s).
+            self.skip_depth = 0
+        if self.skip_depth:
+            if tag == self.skip_tag and tag not in VOID_TAGS:
+                self.skip_depth += 1
+            return
+        if tag == "head":
+            self.in_head = True
+            return
+        if tag in DROP_TAGS or (self.in_head and tag != "title"):
+            if tag not in VOID_TAGS:
+                self.skip_tag = tag
+                self.skip_depth = 1
+            return
+
+        closes = IMPLIED_END.get(tag, ())
+        while self.stack[-1].tag in closes:
+            self._close(self.stack.pop())
+
+        kept = self._attrs(attrs)
+        parent = self.stack[-1]
+        # Repeated siblings (same tag + class) are cut down to a few examples.
+        signature = (tag, dict(attrs).get("class") or "")
+        seen = parent.signatures.get(signature, 0) + 1
+        parent.signatures[signature] = seen
+        if seen > self.keep_siblings:
+            parent.hidden[signature] = parent.hidden.get(signature, 0) + 1
+            if tag not in VOID_TAGS:
+                self.skip_tag = tag
+                self.skip_depth = 1
+            return
+
+        attr_text = "".join(f' {name}="{escape(value)}"' for name, value in kept)
+        self.out.append(f"<{tag}{attr_text}>")
+        if tag not in VOID_TAGS:
+            self.stack.append(_Frame(tag, len(self.out) - 1, bool(kept)))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and not self.skip_depth and self.stack[-1].tag == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                return
+            # An ancestor closed while skipping, e.g. unclosed <li>s before </ul>.
+            if tag == "head" or not any(frame.tag == tag for frame in self.stack[1:]):
+                return
+            self.skip_depth = 0
+        if tag == "head":
+            self.in_head = False
+            return
+        # Tolerate unclosed tags: pop up to the matching open element.
+        if not any(frame.tag == tag for frame in self.stack[1:]):
+            return
+        while True:
+            frame = self.stack.pop()
+            self._close(frame)
+            if frame.tag == tag:
+                break
+
+    def _close(self, frame):
+        for (tag, cls), count in frame.hidden.items():
+            cls_text = f' class="{escape(_clip(cls, self.max_attr))}"' if cls else ""
+            self.out.append(f"<!-- {count} more <{tag}{cls_text}> -->")
+        empty = len(self.out) == frame.start + 1
+        if empty and not frame.has_attrs and frame.tag not in KEEP_EMPTY_TAGS:
+            del self.out[frame.start:]
+            return
+        self.out.append(f"</{frame.tag}>")
+
+    def handle_data(self, data):
+        if self.skip_depth or (self.in_head and self.stack[-1].tag != "title"):
+            return
+        text = _WS_RE.sub(" ", data).strip()
+        if text:
+            self.out.append(escape(_clip(text, self.max_text), quote=False))
+
+    def close(self):
+        super().close()
+        while len(self.stack) > 1:
+            self._close(self.stack.pop())
+        # One element per line; text and closing tags stay inline.
+        return "".join(
+            "\n" + token if token.startswith("<") and not token.startswith("</") else token
+            for token in self.out
+        ).lstrip("\n")
+
+
+def _reduce_once(html: str, keep_siblings: int, max_text: int, max_attr: int, chunk_size: int = 1 << 16):
+    parser = _Reducer(keep_siblings, max_text, max_attr)
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i:i + chunk_size])
+    return parser.close()
+
+
+def reduce_html(html: str, max_chars: int = None, max_tokens: int = None, keep_siblings: int = None):
+    """
+    Shrinks a page DOM to what an LLM needs to write selectors.
+    Drops scripts/styles/SVG and other non-semantic nodes, keeps only
+    selector-friendly attributes, collapses whitespace and cuts repeated
+    sibling lists to a few examples. With max_chars / max_tokens the
+    settings get stricter until the output fits; as a last resort it is
+    truncated. Returns {"html", "raw_chars", "chars", "approx_tokens", "level", "truncated"}.
+    """
+    html = html or ""
+    budget = None
+    if max_chars:
+        budget = int(max_chars)
+    if max_tokens:
+        token_chars = int(max_tokens) * CHARS_PER_TOKEN
+        budget = token_chars if budget is None else min(budget, token_chars)
+
+    levels = [dict(level) for level in _LEVELS]
+    if keep_siblings is not None:
+        for level in levels:
+            level["keep_siblings"] = min(level["keep_siblings"], max(1, int(keep_siblings)))
+
+    reduced = ""
+    level_index = 0
+    for level_index, level in enumerate(levels):
+        reduced = _reduce_once(html, **level)
+        if budget is None or len(reduced) <= budget:
+            break
+
+    truncated = False
+    if budget is not None and len(reduced) > budget:
+        marker = "\n<!-- truncated to fit budget -->"
+        cut = reduced.rfind("\n", 0, max(0, budget - len(marker)))
+        head = reduced[:max(cut, 0)]
+        reduced = head + marker if head else marker.lstrip("\n")
+        # A budget smaller than the marker still gets no more than it asked for.
+        reduced = reduced[:max(0, budget)]
+        truncated = True
+
+    return {
+        "html": reduced,
+        "raw_chars": len(html),
+        "chars": len(reduced),
+        "approx_tokens": len(reduced) // CHARS_PER_TOKEN,
+        "level": level_index,
+        "truncated": truncated,
+    }
+
+
+def reduced_path(filename: str):
+    """page_dom.txt -> page_dom.reduced.txt"""
+    stem, dot, ext = filename.rpartition(".")
+    if not dot or "/" in ext or "\\" in ext:
+        return filename + ".reduced"
+    return f"{stem}.reduced.{ext}"
@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_DIR_NAME = "dom_snapshots"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    url TEXT,
+    title TEXT,
+    captured_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_hash ON captures(hash);
+CREATE INDEX IF NOT EXISTS captures_url ON captures(url, captured_at);
+CREATE INDEX IF NOT EXISTS blobs_last_seen ON blobs(last_seen_at);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class DomStore:
+    """
+    Content-addressed store for DOM snapshots.
+    Each distinct DOM is gzip-compressed once under objects/<hash[:2]>/<hash>.html.gz;
+    every save adds a capture row (url, title, time) to index.sqlite3, so
+    saving an unchanged page costs one index insert. Old captures and, past
+    max_bytes, the least recently seen blobs are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+        self._db = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"),
+            timeout=30.0,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def _object_path(self, digest: str):
+        return os.path.join(self.root, "objects", digest[:2], digest + ".html.gz")
+
+    def _write_object(self, digest: str, raw: bytes):
+        path = self._object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = gzip.compress(raw, compresslevel=6)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+    def save(self, html: str, url: str = "", title: str = ""):
+        """Stores html and returns the snapshot id (its sha256) plus sizes."""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored_size FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+            deduped = row is not None and os.path.exists(self._object_path(digest))
+            if deduped:
+                stored_size = row[0]
+                self._db.execute("UPDATE blobs SET last_seen_at = ? WHERE hash = ?", (now, digest))
+            else:
+                stored_size = self._write_object(digest, raw)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO blobs (hash, raw_size, stored_size, created_at, last_seen_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (digest, len(raw), stored_size, now, now),
+                )
+            cur = self._db.execute(
+                "INSERT INTO captures (hash, url, title, captured_at) VALUES (?, ?, ?, ?)",
+                (digest, url, title, now),
+            )
+            capture_id = cur.lastrowid
+            self._db.commit()
+            # Only new blobs can push the store over max_bytes; age-based
+            # eviction doesn't need to run on every save.
+            if not deduped or now - self._last_evict > 60.0:
+                self._evict(now, keep=digest)
+        return {
+            "snapshot_id": digest,
+            "capture_id": capture_id,
+            "deduped": deduped,
+            "raw_size": len(raw),
+            "stored_size": stored_size,
+        }
+
+    def _resolve(self, snapshot_id: str):
+        if not re.fullmatch(r"[0-9a-f]{4,64}", snapshot_id or ""):
+            return None
+        rows = self._db.execute(
+            "SELECT hash FROM blobs WHERE hash LIKE ? LIMIT 2", (snapshot_id + "%",)
+        ).fetchall()
+        if len(rows) != 1:
+            return None
+        return rows[0][0]
+
+    def load(self, snapshot_id: str):
+        """Returns the html of a snapshot; unique id prefixes are accepted."""
+        with self._lock:
+            digest = self._resolve(snapshot_id)
+        if digest is None:
+            raise Exception(f"Unknown or ambiguous snapshot id '{snapshot_id}'")
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def captures(self, url: str = None, limit: int = 50):
+        query = (
+            "SELECT c.id, c.hash, c.url, c.title, c.captured_at, b.raw_size, b.stored_size "
+            "FROM captures c JOIN blobs b ON b.hash = c.hash"
+        )
+        params = []
+        if url:
+            query += " WHERE c.url = ?"
+            params.append(url)
+        query += " ORDER BY c.id DESC LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [
+            {
+                "capture_id": row[0],
+                "snapshot_id": row[1],
+                "url": row[2],
+                "title": row[3],
+                "captured_at": row[4],
+                "raw_size": row[5],
+                "stored_size": row[6],
+            }
+            for row in rows
+        ]
+
+    def stats(self):
+        with self._lock:
+            blobs, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            captures = self._db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+        return {
+            "root": self.root,
+            "snapshots": blobs,
+            "captures": captures,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+        }
+
+    def _delete_blob(self, digest: str):
+        self._db.execute("DELETE FROM captures WHERE hash = ?", (digest,))
+        self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self, now: float, keep: str = None):
+        self._last_evict = now
+        if self.max_age_seconds:
+            self._db.execute(
+                "DELETE FROM captures WHERE captured_at < ?", (now - self.max_age_seconds,)
+            )
+            orphans = self._db.execute(
+                "SELECT hash FROM blobs WHERE hash NOT IN (SELECT DISTINCT hash FROM captures)"
+            ).fetchall()
+            for (digest,) in orphans:
+                self._delete_blob(digest)
+        if self.max_bytes:
+            total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._db.execute(
+                    "SELECT hash, stored_size FROM blobs ORDER BY last_seen_at ASC"
+                ).fetchall()
+                for digest, stored_size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    if digest == keep:
+                        continue
+                    self._delete_blob(digest)
+                    total -= stored_size
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(root: str, **kwargs):
+    """Returns the shared DomStore for root, opening it on first use."""
+    root = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = DomStore(root, **kwargs)
+            _stores[root] = store
+        return store
@@ -11,175 +11,74 @@ import base64
 from selenium.webdriver.support.ui import WebDriverWait as wait
 import json
 import re
+import socket
 from flask import Flask, request, jsonify
 import threading
 from flask_cors import CORS
 import os
 
+import crawl
+import extraction
+import http_fetch
+import image_store
+import result_sink
+import url_store
+import waits
 
-def extract_title(driver):
-    """
-    Extracts the product title from the page.
-    Assumes the page is loaded and the title element is present.
-    """
-    title_element = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "h1.page-title"))
-    )
-    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", title_element)
-    sleep(0.5)
-    title = title_element.text.strip()
-    print(f"Extracted title: {title}")
-    return title
-
-
-def extract_reference(driver):
-    """
-    Extracts the Kimland product reference from the page.
-    Assumes the page is loaded and the reference element is present.
-    """
-    ref_element = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-code"))
-    )
-    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", ref_element)
-    sleep(0.5)
-    ref_text = ref_element.text.strip()
-    ref = ref_text.replace("Référence :", "").replace("Référence:", "").strip()
-    print(f"Extracted reference: {ref}")
-    return ref
-
-
-def extract_brand(driver):
-    """
-    Extracts the brand name from the brand logo image.
-    Assumes the page is loaded and the brand image is present.
-    """
-    brand_element = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//img[@title and contains(@src, 'upload/logo/')]"))
-    )
-    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", brand_element)
-    sleep(0.5)
-    brand = brand_element.get_attribute("title").strip()
-    print(f"Extracted brand: {brand}")
-    return brand
-
-
-def extract_sizes(driver):
-    """
-    Extracts all available sizes with their inventory quantities.
-    Assumes the page is loaded and the size select element is present.
-    """
-    size_select = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "select[name='pointure']"))
-    )
-    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", size_select)
-    sleep(0.5)
-    
-    options = size_select.find_elements(By.TAG_NAME, "option")
-    sizes = []
-    
-    for option in options:
-        option_text = option.text.strip()
-        parts = option_text.split(" - ")
-        if len(parts) >= 2:
-            size = parts[0].strip()
-            inventory_text = parts[1].strip()
-            inventory = re.sub(r'[^\d]', '', inventory_text)
-            if inventory:
-                sizes.append({
-                    "size": size,
-                    "inventory_quantity": int(inventory)
-                })
-    
-    print(f"Extracted {len(sizes)} sizes")
-    return sizes
 
-
-def extract_price(driver):
-    """
-    Extracts the selling price (Prix de vente) numbers only, without currency.
-    Assumes the page is loaded and the price element is present.
-    """
-    try:
-        price_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//strong[@style='color:green']"))
-        )
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", price_element)
-        sleep(0.5)
-        
-        price_text = price_element.text.strip()
-        price = re.sub(r'[^\d]', '', price_text)
-        print(f"Extracted selling price (Prix de vente): {price}")
-        return price
-    except Exception as e:
-        print(f"Error extracting selling price, trying regular price: {str(e)}")
-        price_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "span.price"))
-        )
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", price_element)
-        sleep(0.5)
-        
-        price_text = price_element.text.strip()
-        price = re.sub(r'[^\d]', '', price_text)
-        print(f"Extracted regular price: {price}")
-        return price
-
-
-def extract_images(driver):
-    """
-    Extracts all product image URLs from the thumbnail carousel.
-    Assumes the page is loaded and the carousel is present.
-    """
-    thumbnails = WebDriverWait(driver, 10).until(
-        lambda d: d.find_elements(By.CSS_SELECTOR, "#thumbnails a[data-image]")
-    )
-    
-    images = []
-    for thumbnail in thumbnails:
-        image_url = thumbnail.get_attribute("data-image")
-        if image_url:
-            full_url = driver.execute_script("return arguments[0];", image_url)
-            if full_url.startswith("upload/"):
-                full_url = f"https://kimland.dz/{full_url}"
-            images.append(full_url)
-    
-    print(f"Extracted {len(images)} images")
-    return images
-
-
-def extract_category_subcategory(driver):
-    """
-    Extracts category and subcategory from the breadcrumb navigation.
-    Assumes the page is loaded and breadcrumb is present.
-    """
-    try:
-        breadcrumb = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "ol.breadcrumb"))
-        )
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", breadcrumb)
-        sleep(0.5)
-        
-        breadcrumb_items = breadcrumb.find_elements(By.TAG_NAME, "li")
-        
-        category = ""
-        subcategory = ""
-        
-        if len(breadcrumb_items) >= 3:
-            category = breadcrumb_items[-2].text.strip()
-        
-        if len(breadcrumb_items) >= 4:
-            subcategory = breadcrumb_items[-1].text.strip()
-        
-        print(f"Category: {category}, Subcategory: {subcategory}")
-        return category, subcategory
-    except Exception as e:
-        print(f"Error extracting breadcrumb: {str(e)}")
-        return "", ""
+def _kimland_size(match):
+    inventory = re.sub(r'[^\d]', '', match["inventory"])
+    if not inventory:
+        return None
+    return {"size": match["size"], "inventory_quantity": int(inventory)}
+
+
+# Every product field, read in one execute_script call.
+KIMLAND_PRODUCT_SCHEMA = {
+    "ref_kimland_side": extraction.Field(
+        "div.product-code",
+        sub=[(r"Référence\s*:", "")],
+    ),
+    "title": extraction.Field("h1.page-title"),
+    "brand": extraction.Field(
+        "//img[@title and contains(@src, 'upload/logo/')]",
+        attr="title",
+    ),
+    "sizes": extraction.Field(
+        "select[name='pointure'] option",
+        many=True,
+        regex=r"^(?P<size>.+?) - (?P<inventory>[^-]*)",
+        transform=_kimland_size,
+    ),
+    "price": extraction.Field(
+        # Selling price (Prix de vente) first, regular price as fallback.
+        ["//strong[@style='color:green']", "span.price"],
+        sub=[(r"[^\d]", "")],
+    ),
+    "images": extraction.Field(
+        "#thumbnails a[data-image]",
+        attr="data-image",
+        many=True,
+        sub=[(r"^upload/", "https://kimland.dz/upload/")],
+    ),
+    "category": extraction.Field("ol.breadcrumb li", index=-2, min_count=3),
+    "tags": extraction.Field("ol.breadcrumb li", index=-1, min_count=4),
+}
+
+KIMLAND_READY_SELECTOR = "h1.page-title, div.product-code"
+KIMLAND_VIP_MESSAGE = "Ce produit est dédié au Pack DIAMOND VIP"
+# Product pages are read for text and image URLs only, so the crawl
+# doesn't download images, video, fonts or trackers (see navigation.py).
+KIMLAND_NAVIGATION_PROFILE = "text-only"
+# Product pages are server-rendered, so they are fetched over HTTP first.
+# A page missing any of these fields goes through the browser instead.
+KIMLAND_HTTP_REQUIRED = ("ref_kimland_side", "title", "price", "sizes")
 
 
 def prompt_user_option():
     """
-    Prompts the user to select one of three extraction options.
-    Returns: 1, 2, or 3 based on user selection.
+    Prompts the user to select one of four extraction options.
+    Returns: 1, 2, 3 or 4 based on user selection.
     """
     print("\n" + "="*50)
     print("PRODUCT EXTRACTION OPTIONS")
@@ -187,14 +86,15 @@ def prompt_user_option():
     print("1. Normal extraction (current page - single product)")
     print("2. Extract product list URLs first, then process them")
     print("3. Process existing URL list (skip URL collection)")
+    print("4. Download product images (resumable)")
     print("="*50)
     
     while True:
-        choice = input("Select option (1/2/3): ").strip()
-        if choice in ['1', '2', '3']:
+        choice = input("Select option (1/2/3/4): ").strip()
+        if choice in ['1', '2', '3', '4']:
             return int(choice)
         else:
-            print("Invalid option. Please enter 1, 2, or 3.")
+            print("Invalid option. Please enter 1, 2, 3 or 4.")
 
 
 def extract_product_urls_from_list(driver):
@@ -205,7 +105,7 @@ def extract_product_urls_from_list(driver):
     Returns: List of product URLs.
     """
     print("Extracting product URLs from list page...")
-    sleep(2)
+    waits.element_count_stable(driver, "div.product-item", stable_ms=500, timeout=10)
     
     product_items = WebDriverWait(driver, 10).until(
         lambda d: d.find_elements(By.CSS_SELECTOR, "div.product-item")
@@ -239,193 +139,211 @@ def extract_product_urls_from_list(driver):
     return urls
 
 
-def load_url_tracking_json(filename):
-    """
-    Loads the URL tracking JSON file.
-    Creates a new structure if file doesn't exist.
-    Returns: Dictionary with 'urls' list.
-    """
-    if not os.path.exists(filename):
-        print(f"{filename} not found, creating new structure")
-        return {"urls": []}
-    
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if "urls" not in data or not isinstance(data["urls"], list):
-                data = {"urls": []}
-            print(f"Loaded {len(data['urls'])} URL(s) from {filename}")
-            return data
-    except Exception as e:
-        print(f"Error loading {filename}: {str(e)}")
-        return {"urls": []}
-
-
-def save_url_tracking_json(filename, data):
-    """
-    Saves the URL tracking data to JSON file.
-    """
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"URL tracking data saved to {filename}")
-    except Exception as e:
-        print(f"Error saving to {filename}: {str(e)}")
-
-
 def add_urls_to_tracking(filename, urls):
     """
-    Adds URLs to the tracking JSON file with visited=False status.
-    Skips URLs that already exist in the file.
+    Adds URLs to the tracking store with visited=False status.
+    Skips URLs that are already tracked, then refreshes the JSON export.
     """
-    data = load_url_tracking_json(filename)
-    
-    existing_urls = [item["url"] for item in data["urls"]]
-    added_count = 0
-    
-    for url in urls:
-        if url not in existing_urls:
-            data["urls"].append({
-                "url": url,
-                "visited": False
-            })
-            added_count += 1
-    
-    save_url_tracking_json(filename, data)
+    store = url_store.open_for_json(filename)
+    added_count = store.add(urls)
+    store.export_json(filename)
     print(f"Added {added_count} new URL(s) to tracking file (skipped {len(urls) - added_count} duplicates)")
 
 
 def mark_url_as_visited(filename, url):
     """
-    Marks a specific URL as visited in the tracking JSON.
+    Marks a specific URL as visited in the tracking store (one row update).
+    The JSON file is re-exported once per run, not per URL.
     """
-    data = load_url_tracking_json(filename)
-    
-    for item in data["urls"]:
-        if item["url"] == url:
-            item["visited"] = True
-            break
-    
-    save_url_tracking_json(filename, data)
+    url_store.open_for_json(filename).mark_visited(url)
 
 
-def process_url_list(driver, url_tracking_file, data_output_file):
+def process_urls_over_http(driver, store, data_output_file, workers=8):
     """
-    Processes each unvisited URL from the tracking file.
-    Extracts product data and marks URLs as visited.
+    Fetches the unvisited URLs over HTTP with the browser's cookies and user
+    agent, and saves every product whose page has all KIMLAND_HTTP_REQUIRED
+    fields. URLs that hit a bot wall, fail or miss fields are left unvisited
+    for the browser crawl. Returns how many were handled over HTTP.
     """
-    data = load_url_tracking_json(url_tracking_file)
+    if not http_fetch.parser_available():
+        print("HTTP fetch skipped: lxml and cssselect are not installed.")
+        return 0
     
-    unvisited_urls = [item for item in data["urls"] if not item["visited"]]
+    fetcher = http_fetch.HttpFetcher(driver, workers=workers)
+    # Same host:pid:... shape as CrawlRunner owners, so reclaim_orphaned_leases covers a crash here.
+    owner = f"{socket.gethostname()}:{os.getpid()}:http-{id(fetcher)}"
+    
+    def leased_urls():
+        while True:
+            urls = store.lease(owner, 1)
+            if not urls:
+                return
+            yield urls[0]
     
-    if len(unvisited_urls) == 0:
+    handled = 0
+    try:
+        for url, extracted, reason in fetcher.extract_many(
+            leased_urls(),
+            KIMLAND_PRODUCT_SCHEMA,
+            required=KIMLAND_HTTP_REQUIRED,
+            contains=[KIMLAND_VIP_MESSAGE],
+        ):
+            if reason and not (extracted and extracted["contains"].get(KIMLAND_VIP_MESSAGE)):
+                print(f"[http] browser fallback ({reason}): {url}")
+                continue
+            save_extracted_product(extracted, data_output_file)
+            # Make the product durable before the URL counts as visited.
+            product_sink(data_output_file).flush()
+            store.mark_visited(url)
+            handled += 1
+    finally:
+        # Whatever is left goes back to the pool for the browser.
+        store.release(owner)
+        fetcher.close()
+    print(f"[http] {handled} URL(s) done over HTTP, stats: {fetcher.stats}")
+    return handled
+
+
+def process_url_list(driver, url_tracking_file, data_output_file, tabs=1, profile=KIMLAND_NAVIGATION_PROFILE, http_first=True):
+    """
+    Processes each unvisited URL from the tracking store with a crawl runner.
+    Page loads overlap across `tabs` tabs; failed URLs are retried with
+    backoff and parked in <tracking file>.dead.json after repeated failures.
+    Progress is checkpointed as it goes, so an interrupted run resumes
+    where it stopped. profile is the navigation profile of the crawl tabs.
+    With http_first, pages are fetched over HTTP first and only the ones
+    that need a browser are loaded in Chrome.
+    """
+    store = url_store.open_for_json(url_tracking_file)
+    counts = store.counts()
+    
+    if counts["unvisited"] == 0:
         print("No unvisited URLs found in the tracking file.")
         return
     
-    print(f"\nFound {len(unvisited_urls)} unvisited URL(s) to process")
+    print(f"\nFound {counts['unvisited']} unvisited URL(s) to process")
     
-    for index, item in enumerate(unvisited_urls):
-        url = item["url"]
-        print("\n" + "="*70)
-        print(f"Processing URL {index + 1}/{len(unvisited_urls)}")
-        print(f"URL: {url}")
-        print("="*70 + "\n")
-        
-        while True:
-            try:
-                driver.get(url)
-                sleep(3)
-                
-                product_data = extract_single_product(driver, data_output_file)
-                
-                if product_data is not None:
-                    mark_url_as_visited(url_tracking_file, url)
-                    print(f"Successfully processed and marked as visited: {url}")
-                else:
-                    print(f"Product extraction returned None (likely unavailable or error)")
-                    mark_url_as_visited(url_tracking_file, url)
-                
-                break
-            except Exception as e:
-                print(f"Error processing URL: {str(e)}")
-                retry = input("Press Enter to retry this URL or 's' to skip: ").strip().lower()
-                if retry == 's':
-                    mark_url_as_visited(url_tracking_file, url)
-                    print(f"Skipped URL: {url}")
-                    break
-        
-        sleep(2)
+    dead_letter_file = os.path.splitext(url_tracking_file)[0] + ".dead.json"
+    
+    if http_first:
+        process_urls_over_http(driver, store, data_output_file)
+    
+    def checkpoint():
+        # Keep the JSON files in sync for tools that still read them.
+        store.export_json(url_tracking_file)
+        save_products(data_output_file)
+        if store.counts()["dead"]:
+            store.export_dead_letters(dead_letter_file)
+    
+    runner = crawl.CrawlRunner(
+        store,
+        lambda d, u: extract_single_product(d, data_output_file),
+        tabs=tabs,
+        checkpoint=checkpoint,
+        profile=profile,
+        commit=product_sink(data_output_file).flush,
+    )
+    stats = runner.run(driver)
     
     print("\n" + "="*70)
     print("FINISHED PROCESSING ALL UNVISITED URLs")
+    print(f"Done: {stats['done']}, dead letters: {stats['dead']}")
     print("="*70)
 
 
+def download_product_images(data_output_file, image_output_dir, workers=8):
+    """
+    Downloads the images of every product in data_output_file into
+    image_output_dir (deduplicated by content, with thumbnails) and writes
+    image_output_dir/manifest.json mapping each product reference to its
+    local files. Images already downloaded and verified are skipped, so
+    this can be rerun after an interruption.
+    """
+    try:
+        with open(data_output_file, "r", encoding="utf-8") as f:
+            products = json.load(f).get("products", [])
+    except FileNotFoundError:
+        print(f"No products file found: {data_output_file}")
+        return None
+    
+    by_ref = {
+        p["ref_kimland_side"]: p.get("images") or []
+        for p in products
+        if p.get("ref_kimland_side")
+    }
+    store = image_store.open_store(image_output_dir, workers=workers)
+    stats = store.download_products(by_ref)
+    manifest_file = store.export_manifest()
+    
+    print(f"Images for {len(by_ref)} product(s): {stats['downloaded']} downloaded, "
+          f"{stats['skipped']} already present, {stats['failed']} failed")
+    print(f"Manifest saved to {manifest_file}")
+    return stats
+
+
+def product_sink(data_output_file):
+    """
+    Returns the append-only sink for data_output_file. Products are
+    journaled to data.jsonl and merged into data.json by compact().
+    """
+    return result_sink.open_sink(data_output_file, key_field="ref_kimland_side", root_key="products")
+
+
+def save_products(data_output_file):
+    """
+    Writes the queued products into data_output_file ({"products": [...]}).
+    """
+    result = product_sink(data_output_file).compact()
+    print(f"Data saved to {data_output_file} (Total products: {result['total']}, new: {result['merged']})")
+
+
 def extract_single_product(driver, data_output_file):
     """
     Extracts product data from the current page and saves to JSON.
-    This is the original extraction logic from main().
-    Returns: Product data dictionary or None if extraction fails.
+    All fields are read by KIMLAND_PRODUCT_SCHEMA in a single browser call.
+    Returns: Product data dictionary or None if it was skipped; raises if
+    the page yielded no product data (see save_extracted_product).
     """
     print("Starting product data extraction...")
-    sleep(2)
-    vip_message = "Ce produit est dédié au Pack DIAMOND VIP"
-    if vip_message in driver.page_source:
+    extracted = extraction.extract(
+        driver,
+        KIMLAND_PRODUCT_SCHEMA,
+        wait_for=KIMLAND_READY_SELECTOR,
+        timeout=10,
+        contains=[KIMLAND_VIP_MESSAGE],
+    )
+    return save_extracted_product(extracted, data_output_file)
+
+
+def save_extracted_product(extracted, data_output_file):
+    """
+    Checks a KIMLAND_PRODUCT_SCHEMA extraction result (from the browser or
+    from HTTP) and queues the product for data_output_file.
+    Returns: Product data dictionary or None if it was skipped (VIP only
+    or no sizes). Raises if nothing was extracted at all.
+    """
+    if extracted["contains"].get(KIMLAND_VIP_MESSAGE):
         print(f">>> Skipping: Diamond VIP restricted product detected.")
         return None
     
-    product_data = {}
-    
-    try:
-        product_data["ref_kimland_side"] = extract_reference(driver)
-    except Exception as e:
-        print(f"Error extracting reference: {str(e)}")
-        product_data["ref_kimland_side"] = ""
-    
-    product_data["ref_shopify_side"] = ""
-    
-    try:
-        product_data["title"] = extract_title(driver)
-    except Exception as e:
-        print(f"Error extracting title: {str(e)}")
-        product_data["title"] = ""
-    
-    try:
-        product_data["brand"] = extract_brand(driver)
-    except Exception as e:
-        print(f"Error extracting brand: {str(e)}")
-        product_data["brand"] = ""
-    
-    try:
-        product_data["sizes"] = extract_sizes(driver)
-    except Exception as e:
-        print(f"Error extracting sizes: {str(e)}")
-        product_data["sizes"] = []
-    
-    try:
-        product_data["price"] = extract_price(driver)
-    except Exception as e:
-        print(f"Error extracting price: {str(e)}")
-        product_data["price"] = ""
-    
-    try:
-        product_data["images"] = extract_images(driver)
-    except Exception as e:
-        print(f"Error extracting images: {str(e)}")
-        product_data["images"] = []
-    
-    try:
-        category, subcategory = extract_category_subcategory(driver)
-        product_data["category"] = category
-        product_data["subcategory"] = ""
-        product_data["description"] = ""
-        product_data["tags"] = subcategory
-    except Exception as e:
-        print(f"Error extracting category/subcategory: {str(e)}")
-        product_data["category"] = ""
-        product_data["subcategory"] = ""
-        product_data["description"] = ""
-        product_data["tags"] = ""
+    for field_name in extracted["missing"]:
+        error = extracted["errors"].get(field_name, "not found on page")
+        print(f"Error extracting {field_name}: {error}")
+    
+    fields = extracted["data"]
+    product_data = {
+        "ref_kimland_side": fields["ref_kimland_side"],
+        "ref_shopify_side": "",
+        "title": fields["title"],
+        "brand": fields["brand"],
+        "sizes": fields["sizes"],
+        "price": fields["price"],
+        "images": fields["images"],
+        "category": fields["category"],
+        "subcategory": "",
+        "description": "",
+        "tags": fields["tags"],
+    }
     
     print("\n" + "="*50)
     print("EXTRACTED PRODUCT DATA:")
@@ -436,59 +354,46 @@ def extract_single_product(driver, data_output_file):
     if not product_data.get("title") and not product_data.get("ref_kimland_side") and not product_data.get("brand"):
         print("ERROR: Product data is empty or incomplete. Not saving to file.")
         print("Please ensure the browser session is active and the page is fully loaded.")
-        return None
+        # Looks like a page that never loaded or a bot wall: raise so the
+        # crawl retries it with backoff instead of marking it visited.
+        raise Exception("Product data is empty (title, ref and brand all missing)")
     
     if not product_data.get("sizes") or len(product_data.get("sizes", [])) == 0:
         print("ERROR: This product is not available (no sizes found).")
         print("Skipping save to file.")
         return None
     
-    data_structure = {"products": []}
-    
-    try:
-        with open(data_output_file, 'r', encoding='utf-8') as f:
-            data_structure = json.load(f)
-            if "products" not in data_structure or not isinstance(data_structure["products"], list):
-                data_structure = {"products": []}
-        print(f"Loaded {len(data_structure['products'])} existing product(s) from {data_output_file}")
-    except FileNotFoundError:
-        print(f"{data_output_file} not found, creating new file")
-    except Exception as e:
-        print(f"Error loading {data_output_file}: {str(e)}")
-        data_structure = {"products": []}
-    
+    sink = product_sink(data_output_file)
     ref_to_check = product_data.get("ref_kimland_side", "")
-    for existing_product in data_structure["products"]:
-        if existing_product.get("ref_kimland_side") == ref_to_check and ref_to_check:
-            print(f"WARNING: Product with reference '{ref_to_check}' already exists in the file.")
-            print("Skipping save to avoid duplicate.")
-            return product_data
+    if not sink.add(product_data):
+        print(f"WARNING: Product with reference '{ref_to_check}' already exists in the file.")
+        print("Skipping save to avoid duplicate.")
+        return product_data
     
-    data_structure["products"].append(product_data)
-    
-    with open(data_output_file, 'w', encoding='utf-8') as f:
-        json.dump(data_structure, f, ensure_ascii=False, indent=2)
-    
-    print(f"Data saved to {data_output_file} (Total products: {len(data_structure['products'])})")
+    print(f"Data queued for {data_output_file} (Total products: {sink.count()})")
     
     return product_data
 
 
 def main(driver):
     """
-    Main function with three extraction options:
+    Main function with four extraction options:
     1. Normal extraction (single product from current page)
     2. Extract product list URLs, then process them
     3. Process existing URL list
+    4. Download product images
     """
     data_output_file = "/Users/mehdi/projects/kimland/assets/api/data.json"
     url_tracking_file = "/Users/mehdi/projects/kimland/assets/browser_flow/product_urls.json"
+    image_output_dir = "/Users/mehdi/projects/kimland/assets/images"
+    parallel_tabs = 3
     
     option = prompt_user_option()
     
     if option == 1:
         print("\n--- OPTION 1: Normal Extraction (Current Page) ---\n")
         extract_single_product(driver, data_output_file)
+        save_products(data_output_file)
     
     elif option == 2:
         print("\n--- OPTION 2: Extract Product List URLs ---\n")
@@ -504,7 +409,8 @@ def main(driver):
         proceed = input("\nProceed with visiting and extracting each URL? (y/n): ").strip().lower()
         
         if proceed == 'y':
-            process_url_list(driver, url_tracking_file, data_output_file)
+            process_url_list(driver, url_tracking_file, data_output_file, tabs=parallel_tabs)
+            download_product_images(data_output_file, image_output_dir)
         else:
             print("URL extraction completed. URLs saved to tracking file.")
             print("Run Option 3 later to process the URLs.")
@@ -512,9 +418,14 @@ def main(driver):
     elif option == 3:
         print("\n--- OPTION 3: Process Existing URL List ---\n")
         
-        if not os.path.exists(url_tracking_file):
+        if not os.path.exists(url_tracking_file) and not os.path.exists(url_store.store_path_for(url_tracking_file)):
             print(f"ERROR: URL tracking file not found: {url_tracking_file}")
             print("Please run Option 2 first to collect URLs.")
             return
         
-        process_url_list(driver, url_tracking_file, data_output_file) 
+        process_url_list(driver, url_tracking_file, data_output_file, tabs=parallel_tabs)
+        download_product_images(data_output_file, image_output_dir)
+    
+    elif option == 4:
+        print("\n--- OPTION 4: Download Product Images ---\n")
+        download_product_images(data_output_file, image_output_dir)
@@ -7,76 +7,68 @@ from selenium.webdriver.common.keys import Keys
 import json
 import re
 import os
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+
+import geocode
+import result_sink
+
+TARGET_LOCATION = "Upper Darby, PA"
 
 def calculate_distance(location):
     """
     Calculate distance from location to Upper Darby, PA
     """
-    try:
-        geolocator = Nominatim(user_agent="marketplace_extractor")
-        sleep(1)
-        target = geolocator.geocode("Upper Darby, PA")
-        if target:
-            target_coords = (target.latitude, target.longitude)
-            sleep(1)
-            loc = geolocator.geocode(location)
-            if loc:
-                return round(geodesic((loc.latitude, loc.longitude), target_coords).miles, 2)
-    except:
-        pass
-    return None
+    return geocode.open_service().distances_miles([location], TARGET_LOCATION)[0]
+
+# Reads every listing card in one execute_script call: link text, URL and the
+# first element in the card whose own text mentions "$" or "free".
+_HARVEST_LISTINGS_JS = """
+var seen = {}, cards = [];
+var links = document.querySelectorAll("a[href*='/marketplace/item/']");
+for (var i = 0; i < links.length; i++) {
+  var link = links[i];
+  var url = link.href;
+  if (!url || url.indexOf('/marketplace/item/') === -1 || seen[url]) { continue; }
+  seen[url] = true;
+  var name = (link.innerText || '').trim() || link.getAttribute('aria-label') || '';
+  var container = link.closest('div[role="article"]') || link.closest('div[data-testid*="marketplace"]') || link.parentElement;
+  var priceText = '';
+  var elements = container ? container.querySelectorAll('*') : [];
+  for (var j = 0; j < elements.length && !priceText; j++) {
+    var el = elements[j], own = '';
+    for (var n = el.firstChild; n; n = n.nextSibling) {
+      if (n.nodeType === 3) { own = n.textContent; break; }
+    }
+    own = own.toLowerCase();
+    if (own.indexOf('$') === -1 && own.indexOf('free') === -1) { continue; }
+    var text = (el.innerText || '').trim().toUpperCase();
+    if (text.indexOf('$') !== -1 || text.indexOf('FREE') !== -1) { priceText = text; }
+  }
+  cards.push({url: url, name: name, price_text: priceText});
+}
+return cards;
+"""
+
+def _parse_price(price_text):
+    if 'FREE' in price_text:
+        return 0
+    price_match = re.search(r'(\d+(?:,\d{3})*(?:\.\d{2})?)', price_text)
+    return int(price_match.group(1).replace(',', '')) if price_match else 0
 
 def extract_all_listings(driver):
     """
     Extracts all visible listings from the current page.
+    The whole page is harvested in a single browser call, so the cost no
+    longer grows with one round trip (and sleep) per listing.
     """
-    listings = []
-    
-    # Find all marketplace listing links
-    links = driver.find_elements(By.XPATH, "//a[contains(@href, '/marketplace/item/')]")
+    cards = driver.execute_script(_HARVEST_LISTINGS_JS) or []
     
-    print(f"Found {len(links)} listing links on page")
+    print(f"Found {len(cards)} listing links on page")
     
-    for idx, link in enumerate(links):
+    listings = []
+    for idx, card in enumerate(cards):
         try:
-            # Scroll into view
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", link)
-            sleep(0.3)
-            
-            url = link.get_attribute("href")
-            if not url or "/marketplace/item/" not in url:
-                continue
-                
-            # Get the text content
-            name = link.text.strip()
-            if not name:
-                name = link.get_attribute("aria-label") or ""
-            
-            # Find the container
-            container = driver.execute_script(
-                "return arguments[0].closest('div[role=\"article\"]') || arguments[0].closest('div[data-testid*=\"marketplace\"]') || arguments[0].parentElement;", 
-                link
-            )
-            
-            # Extract price
-            price = 0
-            try:
-                price_elems = container.find_elements(By.XPATH, ".//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '$') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'free')]")
-                price_text = ""
-                for p in price_elems:
-                    pt = p.text.strip().upper()
-                    if '$' in pt or 'FREE' in pt:
-                        price_text = pt
-                        break
-                if 'FREE' in price_text:
-                    price = 0
-                else:
-                    price_match = re.search(r'(\d+(?:,\d{3})*(?:\.\d{2})?)', price_text)
-                    price = int(price_match.group(1).replace(',', '')) if price_match else 0
-            except:
-                pass
+            name = (card.get("name") or "").strip()
+            price = _parse_price(card.get("price_text") or "")
             
             # Extract location from name
             location = name.split('\n')[-1].strip()
@@ -85,11 +77,11 @@ def extract_all_listings(driver):
                 "name": name,
                 "price": price,
                 "location": location,
-                "url": url,
+                "url": card["url"],
                 "miles": None  # Will be calculated later in batch
             })
             
-            print(f"[{idx+1}/{len(links)}] Extracted: {name[:40]}... | Price: {price}")
+            print(f"[{idx+1}/{len(cards)}] Extracted: {name[:40]}... | Price: {price}")
             
         except Exception as e:
             print(f"Error extracting listing {idx+1}: {str(e)}")
@@ -99,20 +91,11 @@ def extract_all_listings(driver):
 
 def save_listing(data_file, listing):
     """
-    Appends listing to JSON file, skips duplicates by URL.
+    Queues listing for the JSON file, skips duplicates by URL.
+    Call result_sink.open_sink(data_file, ...).compact() to write the file.
     """
-    data = {"listings": []}
-    if os.path.exists(data_file):
-        try:
-            with open(data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except:
-            data = {"listings": []}
-    if any(item["url"] == listing["url"] for item in data["listings"]):
-        return
-    data["listings"].append(listing)
-    with open(data_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    sink = result_sink.open_sink(data_file, key_field="url", root_key="listings")
+    return sink.add(listing)
 def load_miles_cache(cache_file):
     if os.path.exists(cache_file):
         try:
@@ -147,25 +130,25 @@ def main(driver):
     cache_file = "miles_cache.json"
     cache = load_miles_cache(cache_file)
     
-    print(f"\n=== Processing miles for {len(listings)} listings ===")
+    # Uncached locations are geocoded once each (rate limited); without
+    # calc_miles only coordinates already in the geocode cache are used.
+    pending = [l for l in listings if l['location'] and l['location'] not in cache]
+    print(f"\n=== Processing miles for {len(listings)} listings ({len(pending)} not in {cache_file}) ===")
+    service = geocode.open_service()
+    miles = service.distances_miles(
+        [l['location'] for l in pending],
+        TARGET_LOCATION,
+        cached_only=not calc_miles,
+    )
+    for listing, value in zip(pending, miles):
+        if value is not None:
+            cache[listing['location']] = value
     for idx, listing in enumerate(listings):
-        if listing['location']:
-            loc = listing['location']
-            if loc in cache:
-                listing['miles'] = cache[loc]
-                print(f"[{idx+1}/{len(listings)}] Cache hit: '{loc}' -> {listing['miles']} mi")
-            elif calc_miles:
-                print(f"[{idx+1}/{len(listings)}] Calc new: '{loc}'")
-                miles = calculate_distance(loc)
-                listing['miles'] = miles
-                if miles is not None:
-                    cache[loc] = miles
-                    save_miles_cache(cache_file, cache)
-            else:
-                listing['miles'] = None
-                print(f"[{idx+1}/{len(listings)}] Skip uncached '{loc}'")
-        else:
-            listing['miles'] = None
+        listing['miles'] = cache.get(listing['location']) if listing['location'] else None
+        if listing['location'] and listing['miles'] is None:
+            print(f"[{idx+1}/{len(listings)}] No distance for '{listing['location']}'")
+    save_miles_cache(cache_file, cache)
+    print(f"Geocoding: {service.stats()}")
     
     print(f"\n=== Saving {len(listings)} listings ===")
     saved_count = 0
@@ -174,4 +157,5 @@ def main(driver):
         saved_count += 1
         print(f"Saved: {listing['name'][:40]}... | ${listing['price']} | {listing['location'][:25]}... | {listing.get('miles', 'N/A')} mi")
     
-    print(f"\nTotal: {saved_count} listings saved to {data_file}")
+    result = result_sink.open_sink(data_file, key_field="url", root_key="listings").compact()
+    print(f"\nTotal: {saved_count} listings saved to {data_file} ({result['merged']} new, {result['total']} in file)")
@@ -5,6 +5,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 
+import navigation
+import waits
+
 
 def prompt_youtube_url():
     """
@@ -25,8 +28,9 @@ def navigate_to_notegpt(driver):
     """
     target_url = "https://notegpt.io/youtube-transcript-generator"
     if not str(driver.current_url).startswith(target_url):
-        driver.get(target_url)
-        sleep(2)
+        # The form is scripted in after DOMContentLoaded; no need for the load event.
+        navigation.goto(driver, target_url, page_load="eager")
+        waits.dom_quiet(driver, quiet_ms=300, timeout=5)
     WebDriverWait(driver, 20).until(
         EC.presence_of_element_located((By.TAG_NAME, "body"))
     )
@@ -62,7 +66,7 @@ def click_generate_button(driver):
     sleep(0.5)
     generate_button.click()
     print("Clicked generate button.")
-    sleep(2)
+    waits.network_idle(driver, idle_ms=300, timeout=2)
 
 
 def wait_for_transcript(driver):
@@ -135,9 +139,9 @@ def go_to_gemini(driver):
     Navigates to Gemini app after copying transcript.
     """
     target_url = "https://gemini.google.com/app"
-    driver.get(target_url)
+    navigation.goto(driver, target_url, page_load="eager")
     print("Navigated to Gemini.")
-    sleep(2)
+    waits.dom_quiet(driver, quiet_ms=300, timeout=5)
 
 
 def paste_into_gemini_chat(driver, transcript_text):
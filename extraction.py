@@ -0,0 +1,283 @@
+import re
+
+import waits
+
+
+_EXTRACT_JS_BODY = """
+var specs = arguments[0], texts = arguments[1] || [];
+
+function find(sel) {
+  var first = sel.charAt(0);
+  if (first === '/' || first === '(') {
+    var snap = document.evaluate(sel, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var nodes = [];
+    for (var i = 0; i < snap.snapshotLength; i++) { nodes.push(snap.snapshotItem(i)); }
+    return nodes;
+  }
+  return Array.prototype.slice.call(document.querySelectorAll(sel));
+}
+
+function read(el, attr) {
+  var v;
+  if (!attr || attr === 'text') { v = el.innerText || el.textContent || ''; }
+  else if (attr === 'html') { v = el.innerHTML; }
+  else if (attr === 'value') { v = el.value; }
+  else { v = el.getAttribute(attr); }
+  return v === null || v === undefined ? null : String(v).trim();
+}
+
+function run() {
+  var data = {}, matched = {}, errors = {}, contains = {};
+  specs.forEach(function (spec) {
+    var value = null;
+    for (var i = 0; i < spec.selectors.length && value === null; i++) {
+      var sel = spec.selectors[i], els;
+      try { els = find(sel); } catch (e) { errors[spec.name] = sel + ': ' + e.message; continue; }
+      if (!els.length || els.length < (spec.min_count || 0)) { continue; }
+      if (spec.many) {
+        var values = els.map(function (el) { return read(el, spec.attr); })
+          .filter(function (v) { return v !== null && v !== ''; });
+        if (values.length) { value = values; }
+      } else {
+        var idx = spec.index || 0;
+        var el = els[idx < 0 ? els.length + idx : idx];
+        var v = el ? read(el, spec.attr) : null;
+        if (v !== null && v !== '') { value = v; }
+      }
+      if (value !== null) { matched[spec.name] = sel; }
+    }
+    data[spec.name] = value;
+  });
+  if (texts.length) {
+    var html = document.documentElement.outerHTML;
+    texts.forEach(function (t) { contains[t] = html.indexOf(t) !== -1; });
+  }
+  return {data: data, matched: matched, errors: errors, contains: contains, url: location.href};
+}
+"""
+
+_EXTRACT_JS = _EXTRACT_JS_BODY + "\nreturn run();\n"
+
+# Waits in the page for wait_for, then extracts: still one round trip.
+_EXTRACT_ASYNC_JS = _EXTRACT_JS_BODY + """
+var waitFor = arguments[2], timeoutMs = arguments[3], done = arguments[arguments.length - 1];
+var started = Date.now();
+(function poll() {
+  var ready = false;
+  try { ready = find(waitFor).length > 0; } catch (e) { ready = true; }
+  if (ready || Date.now() - started > timeoutMs) {
+    var result = run();
+    result.waited_ms = Date.now() - started;
+    result.wait_timed_out = !ready;
+    done(result);
+  } else {
+    setTimeout(poll, 100);
+  }
+})();
+"""
+
+
+class Field:
+    """
+    One field of an extraction schema.
+    selector: CSS selector or XPath (starts with '/' or '('), or a list of
+      them tried in order as fallbacks.
+    attr: 'text' (default), 'html', 'value' or any attribute name.
+    many: return a list with a value per matching element.
+    index: pick the nth match (negative counts from the end).
+    min_count: only use a selector that matches at least this many elements.
+    sub: [(pattern, replacement), ...] applied to each value.
+    regex: keep group 1 (or the named groups as a dict, or the whole match);
+      values that don't match are dropped.
+    transform: callable applied last; returning None drops the value.
+    default: value used when nothing matched.
+    """
+
+    def __init__(
+        self,
+        selector,
+        attr: str = "text",
+        many: bool = False,
+        index: int = 0,
+        min_count: int = 0,
+        sub=None,
+        regex: str = None,
+        transform=None,
+        default=None,
+    ):
+        self.selectors = [selector] if isinstance(selector, str) else list(selector)
+        self.attr = attr
+        self.many = many
+        self.index = index
+        self.min_count = min_count
+        self.sub = [(re.compile(p), r) for p, r in (sub or [])]
+        self.regex = re.compile(regex) if regex else None
+        self.transform = transform
+        self.default = default if default is not None else ([] if many else "")
+
+    def to_spec(self, name: str):
+        return {
+            "name": name,
+            "selectors": self.selectors,
+            "attr": self.attr,
+            "many": self.many,
+            "index": self.index,
+            "min_count": self.min_count,
+        }
+
+    def clean(self, value: str):
+        for pattern, replacement in self.sub:
+            value = pattern.sub(replacement, value)
+        value = value.strip()
+        if self.regex is not None:
+            match = self.regex.search(value)
+            if match is None:
+                return None
+            if match.groupdict():
+                value = {k: (v or "").strip() for k, v in match.groupdict().items()}
+            elif match.groups():
+                value = (match.group(1) or "").strip()
+            else:
+                value = match.group(0)
+        if self.transform is not None:
+            value = self.transform(value)
+        return value
+
+    def finish(self, raw):
+        if raw is None:
+            return None
+        if self.many:
+            values = [self.clean(v) for v in raw]
+            values = [v for v in values if v not in (None, "")]
+            return values or None
+        value = self.clean(raw)
+        return None if value in (None, "") else value
+
+
+def _as_field(spec):
+    if isinstance(spec, Field):
+        return spec
+    if isinstance(spec, dict):
+        return Field(**spec)
+    return Field(spec)
+
+
+def extract(driver, schema: dict, wait_for: str = None, timeout: float = 10.0, contains=None):
+    """
+    Runs a whole schema ({name: Field | dict | selector}) in one execute_script call.
+    With wait_for (a selector) the page is polled in-browser until it matches
+    or timeout passes, still in the same round trip. contains is a list of
+    strings checked against the page HTML.
+    Returns {"data", "missing", "matched", "errors", "contains", "url"};
+    missing fields get their default in data and are listed in missing.
+    """
+    fields = {name: _as_field(spec) for name, spec in schema.items()}
+    specs = [field.to_spec(name) for name, field in fields.items()]
+    texts = list(contains or [])
+
+    if wait_for:
+        waits.ensure_script_timeout(driver, float(timeout) + 10)
+        raw = driver.execute_async_script(_EXTRACT_ASYNC_JS, specs, texts, wait_for, int(float(timeout) * 1000))
+    else:
+        raw = driver.execute_script(_EXTRACT_JS, specs, texts)
+
+    result = _finish(fields, raw)
+    if wait_for:
+        result["waited_ms"] = raw.get("waited_ms")
+        result["wait_timed_out"] = raw.get("wait_timed_out")
+    return result
+
+
+def _finish(fields: dict, raw: dict):
+    data = {}
+    missing = []
+    errors = dict(raw.get("errors") or {})
+    for name, field in fields.items():
+        try:
+            value = field.finish((raw.get("data") or {}).get(name))
+        except Exception as e:
+            errors[name] = str(e)
+            value = None
+        if value is None:
+            missing.append(name)
+            value = field.default
+        data[name] = value
+
+    return {
+        "data": data,
+        "missing": missing,
+        "matched": raw.get("matched") or {},
+        "errors": errors,
+        "contains": raw.get("contains") or {},
+        "url": raw.get("url"),
+    }
+
+
+def _read_node(el, attr: str):
+    if not attr or attr == "text":
+        # Close to innerText for the inline content schemas read.
+        v = re.sub(r"\s+", " ", el.text_content())
+    elif attr == "html":
+        from lxml import html as lxml_html
+
+        v = (el.text or "") + "".join(lxml_html.tostring(c, encoding="unicode") for c in el)
+    else:
+        v = el.get(attr)
+    return None if v is None else v.strip()
+
+
+def _find_nodes(tree, sel: str):
+    if sel[:1] in ("/", "("):
+        return [n for n in tree.xpath(sel) if hasattr(n, "tag")]
+    return tree.cssselect(sel)
+
+
+def extract_html(html: str, schema: dict, url: str = None, contains=None):
+    """
+    Runs the same schema as extract() against HTML parsed with lxml, for
+    pages fetched without the browser. Text is the element's text content
+    with whitespace collapsed (there is no layout, so no innerText).
+    Needs lxml and cssselect. Returns the same dict as extract().
+    """
+    from lxml import html as lxml_html
+
+    fields = {name: _as_field(spec) for name, spec in schema.items()}
+    tree = lxml_html.fromstring(html)
+    values = {}
+    matched = {}
+    errors = {}
+    for name, field in fields.items():
+        value = None
+        for sel in field.selectors:
+            try:
+                nodes = _find_nodes(tree, sel)
+            except Exception as e:
+                errors[name] = f"{sel}: {e}"
+                continue
+            if not nodes or len(nodes) < (field.min_count or 0):
+                continue
+            if field.many:
+                found = [_read_node(n, field.attr) for n in nodes]
+                found = [v for v in found if v]
+                if found:
+                    value = found
+            else:
+                idx = field.index or 0
+                try:
+                    v = _read_node(nodes[idx], field.attr)
+                except IndexError:
+                    v = None
+                if v:
+                    value = v
+            if value is not None:
+                matched[name] = sel
+                break
+        values[name] = value
+    raw = {
+        "data": values,
+        "matched": matched,
+        "errors": errors,
+        "contains": {t: t in html for t in (contains or [])},
+        "url": url,
+    }
+    return _finish(fields, raw)
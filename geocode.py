@@ -0,0 +1,236 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+EARTH_RADIUS_MILES = 3958.7613
+DEFAULT_CACHE_FILE = "geocode_cache.sqlite3"
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    lat REAL,
+    lon REAL,
+    found INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def normalize_location(location: str):
+    """'  Upper Darby,  PA ' -> 'upper darby, pa' (the cache key)."""
+    text = re.sub(r"\s+", " ", (location or "").strip().lower())
+    return text.strip(" .,;")
+
+
+class TokenBucket:
+    """Blocking token bucket: at most `rate` acquisitions per second, bursts up to capacity."""
+
+    def __init__(self, rate: float = 1.0, capacity: float = 1.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Location:
+    def __init__(self, latitude: float, longitude: float):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class StaticGeocoder:
+    """
+    Offline stand-in with the geopy geocode() interface, backed by a
+    {location: (lat, lon)} table. Counts lookups so tests can check the cache.
+    """
+
+    def __init__(self, table: dict):
+        self.table = {normalize_location(k): v for k, v in table.items()}
+        self.calls = 0
+
+    def geocode(self, query: str):
+        self.calls += 1
+        coords = self.table.get(normalize_location(query))
+        return _Location(*coords) if coords else None
+
+
+def _nominatim():
+    from geopy.geocoders import Nominatim
+
+    return Nominatim(user_agent="marketplace_extractor", timeout=10)
+
+
+class GeocodingService:
+    """
+    Resolves location strings to coordinates through a persistent cache.
+    Each normalized location is looked up at most once; "not found" answers
+    are cached for negative_ttl seconds, errors are not cached. Lookups that
+    do reach the geocoder share one token bucket (Nominatim allows 1/s).
+    """
+
+    def __init__(self, geocoder=None, cache_path: str = DEFAULT_CACHE_FILE, rate_per_second: float = 1.0, negative_ttl: float = DEFAULT_NEGATIVE_TTL):
+        self._geocoder = geocoder
+        self.cache_path = cache_path
+        self.negative_ttl = negative_ttl
+        self.limiter = TokenBucket(rate=rate_per_second)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path, timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self.lookups = 0
+        self.cache_hits = 0
+
+    @property
+    def geocoder(self):
+        if self._geocoder is None:
+            self._geocoder = _nominatim()
+        return self._geocoder
+
+    def _cached(self, key: str):
+        """Returns (hit, coords); a live negative entry is a hit with coords None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lat, lon, found, fetched_at FROM geocodes WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        lat, lon, found, fetched_at = row
+        if found:
+            return True, (lat, lon)
+        if time.time() - fetched_at < self.negative_ttl:
+            return True, None
+        return False, None
+
+    def _store(self, key: str, query: str, coords):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocodes (key, query, lat, lon, found, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    query,
+                    coords[0] if coords else None,
+                    coords[1] if coords else None,
+                    1 if coords else 0,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def resolve(self, location: str, cached_only: bool = False):
+        """Returns (lat, lon) or None."""
+        key = normalize_location(location)
+        if not key:
+            return None
+        hit, coords = self._cached(key)
+        if hit:
+            self.cache_hits += 1
+            return coords
+        if cached_only:
+            return None
+        self.limiter.acquire()
+        self.lookups += 1
+        try:
+            found = self.geocoder.geocode(location)
+        except Exception as e:
+            print(f"[geocode] Lookup failed for '{location}': {e}")
+            return None
+        coords = (found.latitude, found.longitude) if found else None
+        self._store(key, location, coords)
+        return coords
+
+    def resolve_many(self, locations, cached_only: bool = False):
+        """Resolves each distinct normalized location once; returns {key: coords}."""
+        resolved = {}
+        for location in locations:
+            key = normalize_location(location)
+            if key and key not in resolved:
+                resolved[key] = self.resolve(location, cached_only=cached_only)
+        return resolved
+
+    def distances_miles(self, locations, target: str, cached_only: bool = False, ndigits: int = 2):
+        """
+        Great-circle miles from each location to target, in input order
+        (None where a location can't be resolved). Coordinates are resolved
+        once per distinct location, then all distances are computed in one pass.
+        """
+        locations = list(locations)
+        target_coords = self.resolve(target, cached_only=cached_only)
+        if target_coords is None:
+            return [None] * len(locations)
+        resolved = self.resolve_many(locations, cached_only=cached_only)
+        points = [resolved.get(normalize_location(loc)) for loc in locations]
+        miles = haversine_miles([p for p in points if p], target_coords)
+        it = iter(miles)
+        return [round(next(it), ndigits) if p else None for p in points]
+
+    def stats(self):
+        with self._lock:
+            total, found = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(found), 0) FROM geocodes"
+            ).fetchone()
+        return {
+            "cached": total,
+            "cached_found": found,
+            "lookups": self.lookups,
+            "cache_hits": self.cache_hits,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def haversine_miles(points, target):
+    """Distances in miles from each (lat, lon) in points to target, vectorized with numpy when available."""
+    if not points:
+        return []
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    lat2, lon2 = math.radians(target[0]), math.radians(target[1])
+    if np is not None:
+        arr = np.radians(np.asarray(points, dtype=float))
+        lat1, lon1 = arr[:, 0], arr[:, 1]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * math.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return (2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))).tolist()
+    out = []
+    for lat, lon in points:
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        out.append(2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a)))
+    return out
+
+
+def open_service(cache_path: str = DEFAULT_CACHE_FILE, **kwargs):
+    """Returns the shared GeocodingService for cache_path, opening it on first use."""
+    path = os.path.abspath(cache_path)
+    with _services_lock:
+        service = _services.get(path)
+        if service is None:
+            service = GeocodingService(cache_path=path, **kwargs)
+            _services[path] = service
+        return service
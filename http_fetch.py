@@ -0,0 +1,187 @@
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import extraction
+import jobs
+
+
+# Text that shows up on challenge / block pages instead of the real page.
+# Plain "captcha" is left out: normal pages embed reCAPTCHA in forms, and a
+# challenge page is caught anyway by the required-fields check.
+BOT_WALL_MARKERS = (
+    "cf-challenge",
+    "cf_chl_",
+    "challenge-platform",
+    "<title>just a moment...</title>",
+    "attention required! | cloudflare",
+    "<title>access denied</title>",
+    "are you a robot",
+    "unusual traffic from your computer",
+)
+BOT_WALL_STATUSES = (401, 403, 407, 429, 503)
+
+
+def looks_blocked(status: int, html: str):
+    """Returns why a response looks like a bot wall (None if it looks like a page)."""
+    if status in BOT_WALL_STATUSES:
+        return f"status {status}"
+    head = (html or "")[:20000].lower()
+    for marker in BOT_WALL_MARKERS:
+        if marker in head:
+            return f"bot wall ({marker})"
+    if len(html or "") < 512:
+        return "near-empty page"
+    return None
+
+
+def _meta_charset(content: bytes):
+    match = re.search(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_-]+)""", content[:4096], re.I)
+    return match.group(1).decode("ascii") if match else None
+
+
+def parser_available():
+    """True when lxml and cssselect (needed by extraction.extract_html) are installed."""
+    try:
+        import lxml.html  # noqa: F401
+        import cssselect  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpFetcher:
+    """
+    Fetches pages over plain HTTP with the browser's identity: cookies and
+    user agent are copied from a live driver into a pooled requests session,
+    so sessions/logins carry over. Pages are fetched and parsed on a thread
+    pool; anything that looks like a bot wall or lacks required fields is
+    reported back for the caller to load in the browser instead.
+    """
+
+    def __init__(self, driver=None, workers: int = 8, timeout: float = 15.0):
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "ok": 0, "fallback": 0, "bytes": 0}
+        if driver is not None:
+            self.sync_from_driver(driver)
+
+    def sync_from_driver(self, driver):
+        """
+        Copies user agent, languages and cookies from the driver. Selenium
+        only returns the cookies of the current page's domain, so call this
+        while the driver is on the site being fetched.
+        """
+        identity = driver.execute_script(
+            "return {ua: navigator.userAgent, langs: navigator.languages || [navigator.language]};"
+        ) or {}
+        headers = {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        }
+        if identity.get("ua"):
+            headers["User-Agent"] = identity["ua"]
+        langs = [lang for lang in identity.get("langs") or [] if lang]
+        if langs:
+            headers["Accept-Language"] = ",".join(
+                lang if i == 0 else f"{lang};q={max(0.1, 1 - i / 10):.1f}" for i, lang in enumerate(langs)
+            )
+        self.session.headers.update(headers)
+        cookies = driver.get_cookies()
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain"),
+                path=cookie.get("path") or "/",
+                secure=bool(cookie.get("secure")),
+            )
+        return len(cookies)
+
+    def fetch(self, url: str):
+        """Returns {"url", "final_url", "status", "html", "elapsed_ms", "error"}."""
+        started = time.time()
+        try:
+            resp = self.session.get(url, timeout=self.timeout, allow_redirects=True)
+            if "charset" not in resp.headers.get("Content-Type", "").lower():
+                # requests would assume ISO-8859-1; use the page's own meta charset.
+                resp.encoding = _meta_charset(resp.content) or "utf-8"
+            html = resp.text
+            result = {"url": url, "final_url": resp.url, "status": resp.status_code, "html": html, "error": None}
+            size = len(resp.content)
+        except Exception as e:
+            result = {"url": url, "final_url": None, "status": None, "html": "", "error": str(e)}
+            size = 0
+        result["elapsed_ms"] = round((time.time() - started) * 1000, 1)
+        with self._lock:
+            self.stats["fetched"] += 1
+            self.stats["bytes"] += size
+        return result
+
+    def _fetch_and_extract(self, url: str, schema: dict, required, contains):
+        page = self.fetch(url)
+        if page["error"]:
+            return url, None, f"fetch failed: {page['error']}"
+        reason = looks_blocked(page["status"], page["html"])
+        if reason is None and page["status"] >= 400:
+            reason = f"status {page['status']}"
+        if reason:
+            return url, None, reason
+        try:
+            extracted = extraction.extract_html(page["html"], schema, url=page["final_url"], contains=contains)
+        except Exception as e:
+            return url, None, f"parse failed: {e}"
+        missing = [name for name in required if name in extracted["missing"]]
+        if missing:
+            return url, extracted, f"missing {', '.join(missing)}"
+        extracted["elapsed_ms"] = page["elapsed_ms"]
+        return url, extracted, None
+
+    def extract_many(self, urls, schema: dict, required=(), contains=None):
+        """
+        Fetches urls concurrently (at most `workers` in flight; urls is read
+        lazily) and runs schema on each page. Yields (url, extracted, reason)
+        in completion order. reason is None when the HTTP result is usable;
+        otherwise it says why the URL should go through the browser
+        (extracted may still hold what was found).
+        """
+        pending = iter(urls)
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+
+            def submit_next():
+                url = next(pending, None)
+                if url is None:
+                    return False
+                in_flight.add(pool.submit(self._fetch_and_extract, url, schema, list(required), contains))
+                return True
+
+            for _ in range(self.workers):
+                if not submit_next():
+                    break
+            try:
+                while in_flight:
+                    jobs.check_cancelled()
+                    done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.discard(future)
+                        url, extracted, reason = future.result()
+                        with self._lock:
+                            self.stats["fallback" if reason else "ok"] += 1
+                        yield url, extracted, reason
+                        submit_next()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def close(self):
+        self.session.close()
+
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import jobs
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT,
+    path TEXT,
+    thumb TEXT,
+    bytes INTEGER,
+    mtime_ns INTEGER,
+    content_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    error TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_sha ON images(sha256);
+CREATE TABLE IF NOT EXISTS product_images (
+    ref TEXT NOT NULL,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (ref, url)
+);
+"""
+
+# Columns added after the first release; created on open if missing.
+_ADDED_COLUMNS = (("mtime_ns", "INTEGER"),)
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+    "image/svg+xml": ".svg",
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _sha256_file(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ImageStore:
+    """
+    Content-addressed image downloads under root_dir:
+      files/<sha[:2]>/<sha>.<ext>   one file per distinct image content
+      thumbs/<sha[:2]>/<sha>.jpg    PIL thumbnail (when Pillow is installed)
+      manifest.sqlite3              url -> file, product ref -> urls
+    Images are downloaded on a bounded thread pool over one pooled HTTP
+    session. A URL whose file is present and matches its recorded hash is
+    not downloaded again, so an interrupted run is resumed by rerunning it.
+    """
+
+    def __init__(self, root_dir: str, workers: int = 8, timeout: float = 20.0, thumb_size=(320, 320), session=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+        self.thumb_size = tuple(thumb_size) if thumb_size else None
+        os.makedirs(os.path.join(self.root_dir, "files"), exist_ok=True)
+        os.makedirs(os.path.join(self.root_dir, "thumbs"), exist_ok=True)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._lock = threading.Lock()
+        # URLs whose file was hashed and matched during this process.
+        self._checked = set()
+        self._db = sqlite3.connect(os.path.join(self.root_dir, "manifest.sqlite3"), timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(images)")}
+        for name, decl in _ADDED_COLUMNS:
+            if name not in existing:
+                self._db.execute(f"ALTER TABLE images ADD COLUMN {name} {decl}")
+        self._db.commit()
+
+    def _abs(self, rel_path: str):
+        return os.path.join(self.root_dir, rel_path) if rel_path else None
+
+    def _verified(self, url: str):
+        """
+        True if url's file is on disk with the recorded hash (and its
+        thumbnail exists). A file whose size and mtime match the manifest
+        is trusted; only a mismatch costs a re-hash.
+        """
+        if url in self._checked:
+            return True
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, path, thumb, bytes, mtime_ns FROM images WHERE url = ? AND sha256 IS NOT NULL",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return False
+        sha, path, thumb, size, mtime_ns = row
+        full = self._abs(path)
+        try:
+            st = os.stat(full)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            if st.st_size != size or _sha256_file(full) != sha:
+                return False
+            # Same content, new mtime (e.g. copied); remember it to skip the hash next time.
+            with self._lock:
+                self._db.execute("UPDATE images SET mtime_ns = ? WHERE url = ?", (st.st_mtime_ns, url))
+                self._db.commit()
+        if thumb and not os.path.exists(self._abs(thumb)):
+            return False
+        self._checked.add(url)
+        return True
+
+    def _download(self, url: str):
+        """Runs in a pool thread. Returns a manifest record for url."""
+        record = {"url": url, "fetched_at": time.time(), "error": None}
+        tmp_path = os.path.join(self.root_dir, "files", f".{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            h = hashlib.sha256()
+            size = 0
+            with self.session.get(url, timeout=self.timeout, stream=True) as resp:
+                resp.raise_for_status()
+                content_type = (resp.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+                with open(tmp_path, "wb") as f:
+                    for chunk in resp.iter_content(1 << 16):
+                        h.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+            sha = h.hexdigest()
+            ext = _EXTENSIONS.get(content_type) or os.path.splitext(url.split("?")[0])[1].lower() or ".bin"
+            rel_path = os.path.join("files", sha[:2], sha + ext)
+            full = self._abs(rel_path)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            if os.path.exists(full) and _sha256_file(full) == sha:
+                # Same content already stored (another URL or product).
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, full)
+            record.update(
+                {
+                    "sha256": sha,
+                    "path": rel_path,
+                    "bytes": size,
+                    "mtime_ns": os.stat(full).st_mtime_ns,
+                    "content_type": content_type,
+                }
+            )
+            record.update(self._thumbnail(full, sha))
+        except Exception as e:
+            record["error"] = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return record
+
+    def _thumbnail(self, full_path: str, sha: str):
+        if not self.thumb_size:
+            return {}
+        try:
+            from PIL import Image
+        except ImportError:
+            return {}
+        rel_thumb = os.path.join("thumbs", sha[:2], sha + ".jpg")
+        thumb_path = self._abs(rel_thumb)
+        try:
+            with Image.open(full_path) as img:
+                width, height = img.size
+                if not os.path.exists(thumb_path):
+                    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+                    img.thumbnail(self.thumb_size)
+                    tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+                    img.convert("RGB").save(tmp_path, "JPEG", quality=85)
+                    os.replace(tmp_path, thumb_path)
+        except Exception as e:
+            # Not a raster image PIL can read (e.g. SVG); keep the file, skip the thumb.
+            print(f"[images] No thumbnail for {full_path}: {e}")
+            return {}
+        return {"thumb": rel_thumb, "width": width, "height": height}
+
+    def _save(self, record: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images "
+                "(url, sha256, path, thumb, bytes, mtime_ns, content_type, width, height, error, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["url"],
+                    record.get("sha256"),
+                    record.get("path"),
+                    record.get("thumb"),
+                    record.get("bytes"),
+                    record.get("mtime_ns"),
+                    record.get("content_type"),
+                    record.get("width"),
+                    record.get("height"),
+                    record.get("error"),
+                    record["fetched_at"],
+                ),
+            )
+            self._db.commit()
+
+    def link(self, ref: str, urls):
+        """Records that product ref uses urls (in that order), replacing its previous list."""
+        with self._lock:
+            try:
+                # One transaction: readers never see the product without images.
+                self._db.execute("DELETE FROM product_images WHERE ref = ?", (ref,))
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO product_images (ref, url, position) VALUES (?, ?, ?)",
+                    ((ref, url, i) for i, url in enumerate(urls)),
+                )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def download(self, urls):
+        """
+        Downloads every distinct url that isn't already stored and verified.
+        Returns {"downloaded", "skipped", "failed", "bytes"}.
+        """
+        stats = {"downloaded": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        todo = []
+        for url in dict.fromkeys(u for u in urls if u):
+            if self._verified(url):
+                stats["skipped"] += 1
+            else:
+                todo.append(url)
+        pending = iter(todo)
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+
+            def submit_next():
+                url = next(pending, None)
+                if url is not None:
+                    in_flight.add(pool.submit(self._download, url))
+
+            for _ in range(self.workers):
+                submit_next()
+            try:
+                while in_flight:
+                    jobs.check_cancelled()
+                    done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.discard(future)
+                        record = future.result()
+                        self._save(record)
+                        if record["error"]:
+                            stats["failed"] += 1
+                            print(f"[images] Failed {record['url']}: {record['error']}")
+                        else:
+                            self._checked.add(record["url"])
+                            stats["downloaded"] += 1
+                            stats["bytes"] += record.get("bytes") or 0
+                        submit_next()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        return stats
+
+    def download_products(self, products: dict):
+        """products is {ref: [image urls]}. Links and downloads them all."""
+        for ref, urls in products.items():
+            self.link(ref, urls)
+        return self.download(url for urls in products.values() for url in urls)
+
+    def manifest(self):
+        """{ref: [{"url", "sha256", "path", "thumb", "error"}]} with paths relative to root_dir."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.ref, p.url, i.sha256, i.path, i.thumb, i.error FROM product_images p "
+                "LEFT JOIN images i ON i.url = p.url ORDER BY p.ref, p.position"
+            ).fetchall()
+        result = {}
+        for ref, url, sha, path, thumb, error in rows:
+            result.setdefault(ref, []).append(
+                {"url": url, "sha256": sha, "path": path, "thumb": thumb, "error": error}
+            )
+        return result
+
+    def export_manifest(self, filename: str = None):
+        """Writes manifest() as JSON (default root_dir/manifest.json, atomically)."""
+        filename = filename or os.path.join(self.root_dir, "manifest.json")
+        data = self.manifest()
+        tmp_path = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, filename)
+        return filename
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(root_dir: str, **kwargs):
+    """Returns the shared ImageStore for root_dir, opening it on first use."""
+    path = os.path.abspath(root_dir)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ImageStore(path, **kwargs)
+            _stores[path] = store
+        return store
@@ -0,0 +1,173 @@
+import collections
+import threading
+import time
+import traceback
+import uuid
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, params: dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.worker = None
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self.state_lock = threading.Lock()
+
+    def to_dict(self, include_result: bool = True):
+        out = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "worker": self.worker,
+            "cancel_requested": self.cancel_event.is_set(),
+        }
+        if self.params.get("module"):
+            out["module"] = self.params.get("module")
+        if include_result:
+            out["result"] = self.result
+            out["error"] = self.error
+            out["traceback"] = self.traceback
+        return out
+
+
+class JobTable:
+    """
+    Bounded table of jobs. Finished jobs expire after ttl_seconds; when the
+    table is full the oldest finished jobs are dropped first.
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl_seconds: float = 3600.0):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        for job_id, job in list(self._jobs.items()):
+            if job.status in FINISHED_STATES and now - (job.finished_at or now) > self.ttl_seconds:
+                del self._jobs[job_id]
+        if len(self._jobs) < self.max_jobs:
+            return
+        for job_id, job in list(self._jobs.items()):
+            if job.status in FINISHED_STATES:
+                del self._jobs[job_id]
+                if len(self._jobs) < self.max_jobs:
+                    return
+
+    def create(self, kind: str, params: dict):
+        with self._lock:
+            self._evict(time.time())
+            if len(self._jobs) >= self.max_jobs:
+                raise Exception(f"Job table is full ({self.max_jobs} active jobs)")
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._evict(time.time())
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            self._evict(time.time())
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str, reason=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+        with job.state_lock:
+            if job.status in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                # Never reached a driver; finish it right away.
+                job.status = CANCELLED
+                job.error = reason
+                job.finished_at = time.time()
+                job.done_event.set()
+        return job
+
+    def counts(self):
+        with self._lock:
+            counts = collections.Counter(job.status for job in self._jobs.values())
+            return dict(counts)
+
+
+def run_job(job: Job, fn, driver, worker=None):
+    """
+    Runs fn(driver) as job on the calling (driver) thread, recording the
+    outcome on the job. Jobs cancelled while queued are skipped.
+    """
+    with job.state_lock:
+        if job.status != QUEUED:
+            return None
+        job.status = RUNNING
+        job.worker = worker
+        job.started_at = time.time()
+
+    _current.job = job
+    try:
+        job.result = fn(driver)
+        job.status = SUCCEEDED
+        return job.result
+    except JobCancelled as e:
+        job.status = CANCELLED
+        job.error = str(e) or "Job cancelled"
+        raise
+    except Exception as e:
+        job.status = FAILED
+        job.error = str(e)
+        job.traceback = traceback.format_exc()
+        raise
+    finally:
+        _current.job = None
+        job.finished_at = time.time()
+        job.done_event.set()
+
+
+def current_job():
+    return getattr(_current, "job", None)
+
+
+def is_cancelled():
+    job = current_job()
+    return job is not None and job.cancel_event.is_set()
+
+
+def check_cancelled():
+    """
+    Call from long-running module loops; raises JobCancelled once the
+    caller has cancelled the job (DELETE /jobs/{id} or a timed out /run_module).
+    """
+    if is_cancelled():
+        raise JobCancelled(f"Job {current_job().id} was cancelled")
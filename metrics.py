@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+
+
+# Seconds: from a quick control command up to a long module run.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Bytes/characters: 1 KB .. 64 MB in steps of 4.
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels=(), collect=None):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        # Optional callable returning [(label values tuple, value)], read at
+        # scrape time so the hot path never has to update the metric.
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict):
+        if set(labels) != set(self.labels):
+            raise Exception(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def _samples(self):
+        if self.collect is not None:
+            try:
+                return [(tuple(str(v) for v in key), value) for key, value in self.collect()]
+            except Exception:
+                return []
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._samples()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, +Inf last; then sum.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1])) for key, state in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, cls, name: str, *args, **kwargs):
+        """Returns the metric called name, creating it on first use (module reloads reuse it)."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise Exception(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels=(), collect=None):
+    metric = REGISTRY.get_or_create(Counter, name, help_text, labels)
+    if collect is not None:
+        metric.collect = collect
+    return metric
+
+
+def gauge(name: str, help_text: str, labels=(), collect=None):
+    metric = REGISTRY.get_or_create(Gauge, name, help_text, labels)
+    if collect is not None:
+        metric.collect = collect
+    return metric
+
+
+def histogram(name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+
+def render():
+    return REGISTRY.render()
+
+
+# Daemon metrics, updated from run.py.
+HTTP_REQUESTS = counter("bot_http_requests_total", "HTTP requests handled, by endpoint and status.", ("method", "path", "status"))
+HTTP_LATENCY = histogram("bot_http_request_duration_seconds", "HTTP request latency, by endpoint.", ("method", "path"))
+QUEUE_WAIT = histogram("bot_queue_wait_seconds", "Time commands waited in the queue before a driver took them.", ("priority",))
+COMMANDS = counter("bot_commands_total", "Commands run on a driver loop, by outcome.", ("worker", "outcome"))
+BUSY_SECONDS = counter("bot_worker_busy_seconds_total", "Time each driver loop spent running commands.", ("worker",))
+MODULE_RUNS = counter("bot_module_runs_total", "Task module runs, by outcome.", ("module", "outcome"))
+MODULE_DURATION = histogram("bot_module_duration_seconds", "Task module run time.", ("module",))
+NAVIGATIONS = counter("bot_navigations_total", "Page loads through /navigate and batch steps.", ("profile", "page_load", "outcome"))
+NAVIGATION_DURATION = histogram("bot_navigation_duration_seconds", "Time until a navigation was ready.", ("page_load",))
+NAVIGATION_BYTES = counter("bot_navigation_transferred_bytes_total", "Bytes transferred by page loads.", ("profile",))
+NAVIGATION_BLOCKED = counter("bot_navigation_blocked_requests_total", "Requests blocked by navigation profiles.", ("profile",))
+DOM_SNAPSHOT_SIZE = histogram(
+    "bot_dom_snapshot_chars",
+    "Size of saved DOM snapshots (full, reduced) and deltas, in characters.",
+    ("kind",),
+    buckets=SIZE_BUCKETS,
+)
+START_TIME = gauge("bot_start_time_seconds", "Unix time the metrics module was loaded.")
+START_TIME.set(time.time())
@@ -0,0 +1,153 @@
+import hashlib
+import importlib
+import inspect
+import os
+import sys
+import threading
+import time
+
+
+def _file_hash(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModuleEntry:
+    def __init__(self, name: str):
+        self.name = name
+        self.module = None
+        self.main_fn = None
+        self.accepts_payload = False
+        self.source_path = None
+        self.mtime_ns = None
+        self.size = None
+        self.sha256 = None
+        self.loaded_at = None
+        self.load_ms = None
+        self.loads = 0
+        self.cache_hits = 0
+        self.last_error = None
+
+    def bind(self, module):
+        if not hasattr(module, "main"):
+            raise Exception(f"Module '{self.name}' does not have a main(driver) function")
+        main_fn = getattr(module, "main")
+        self.module = module
+        self.main_fn = main_fn
+        self.accepts_payload = len(inspect.signature(main_fn).parameters) >= 2
+        self.source_path = getattr(module, "__file__", None)
+
+    def fingerprint(self):
+        if not self.source_path:
+            return None
+        st = os.stat(self.source_path)
+        return st.st_mtime_ns, st.st_size
+
+    def to_dict(self):
+        return {
+            "module": self.name,
+            "source_path": self.source_path,
+            "sha256": self.sha256,
+            "accepts_payload": self.accepts_payload,
+            "loaded_at": self.loaded_at,
+            "last_load_ms": self.load_ms,
+            "loads": self.loads,
+            "reloads": max(0, self.loads - 1),
+            "cache_hits": self.cache_hits,
+            "last_error": self.last_error,
+        }
+
+
+class ModuleRegistry:
+    """
+    Caches imported task modules and their resolved main() callables.
+    A module is reloaded only when its source file changed (mtime/size
+    first, then content hash), or when reload() is called explicitly.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def _load(self, entry: ModuleEntry, fresh: bool):
+        started = time.time()
+        try:
+            if fresh and entry.name in sys.modules:
+                module = importlib.reload(sys.modules[entry.name])
+            else:
+                module = importlib.import_module(entry.name)
+            entry.bind(module)
+        except Exception as e:
+            entry.last_error = str(e)
+            raise
+        fingerprint = entry.fingerprint()
+        entry.mtime_ns, entry.size = fingerprint if fingerprint else (None, None)
+        entry.sha256 = _file_hash(entry.source_path) if entry.source_path else None
+        entry.loaded_at = time.time()
+        entry.load_ms = round((entry.loaded_at - started) * 1000, 1)
+        entry.loads += 1
+        entry.last_error = None
+
+    def _is_stale(self, entry: ModuleEntry):
+        if entry.main_fn is None:
+            return True
+        try:
+            fingerprint = entry.fingerprint()
+        except OSError:
+            return True
+        if fingerprint is None or fingerprint == (entry.mtime_ns, entry.size):
+            return False
+        # Touched but maybe not edited (git checkout, editors saving twice).
+        if _file_hash(entry.source_path) == entry.sha256:
+            entry.mtime_ns, entry.size = fingerprint
+            return False
+        return True
+
+    def resolve(self, module_name: str):
+        """Returns (main_fn, accepts_payload) for the module, reloading it if needed."""
+        with self._lock:
+            entry = self._entries.get(module_name)
+            if entry is None:
+                entry = ModuleEntry(module_name)
+                # Modules imported elsewhere may be stale; load them fresh once.
+                self._load(entry, fresh=True)
+                self._entries[module_name] = entry
+            elif self._is_stale(entry):
+                self._load(entry, fresh=True)
+            else:
+                entry.cache_hits += 1
+            return entry.main_fn, entry.accepts_payload
+
+    def known(self, module_name: str):
+        """True once module_name has been imported successfully."""
+        with self._lock:
+            return module_name in self._entries
+
+    def call(self, module_name: str, driver, payload: dict):
+        main_fn, accepts_payload = self.resolve(module_name)
+        if accepts_payload:
+            return main_fn(driver, payload)
+        return main_fn(driver)
+
+    def reload(self, module_name=None):
+        """Reloads one module (importing it if new) or every known module."""
+        with self._lock:
+            names = [module_name] if module_name else list(self._entries)
+            reloaded = []
+            for name in names:
+                entry = self._entries.get(name) or ModuleEntry(name)
+                try:
+                    self._load(entry, fresh=True)
+                except Exception as e:
+                    reloaded.append({"module": name, "error": str(e)})
+                    continue
+                self._entries[name] = entry
+                reloaded.append(entry.to_dict())
+            return reloaded
+
+    def stats(self):
+        with self._lock:
+            return [entry.to_dict() for entry in self._entries.values()]
@@ -0,0 +1,348 @@
+import contextlib
+import json
+import threading
+import time
+
+import jobs
+
+
+# Network.setBlockedURLs only matches URL patterns ('*' wildcard), so
+# resource types are blocked by the file extensions that carry them.
+# Each extension is listed bare and with a query string.
+def _ext_patterns(*exts):
+    patterns = []
+    for ext in exts:
+        patterns += [f"*.{ext}", f"*.{ext}?*"]
+    return patterns
+
+
+BLOCK_GROUPS = {
+    "image": _ext_patterns("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "media": _ext_patterns("mp4", "webm", "m3u8", "mpd", "mov", "mp3", "m4a", "ogg", "wav"),
+    "font": _ext_patterns("woff", "woff2", "ttf", "otf", "eot"),
+    "tracker": [
+        "*google-analytics.com/*",
+        "*googletagmanager.com/*",
+        "*doubleclick.net/*",
+        "*googlesyndication.com/*",
+        "*googleadservices.com/*",
+        "*connect.facebook.net/*",
+        "*hotjar.com/*",
+        "*clarity.ms/*",
+        "*criteo.com/*",
+        "*criteo.net/*",
+        "*taboola.com/*",
+        "*outbrain.com/*",
+    ],
+}
+
+# Stylesheets are never blocked: innerText (and so every text read)
+# depends on the computed layout.
+PROFILES = {
+    "full": (),
+    "no-media": ("media", "font", "tracker"),
+    "text-only": ("image", "media", "font", "tracker"),
+}
+
+DEFAULT_PROFILE = "full"
+
+_RESOURCE_TIMING_JS = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+entries.forEach(function (e) { bytes += e.transferSize || 0; });
+return {requests: entries.length, bytes: bytes};
+"""
+
+# (id(driver), window handle) -> tuple of patterns currently blocked there.
+# CDP commands go to the current tab only, so each tab is tracked apart.
+_applied = {}
+_lock = threading.Lock()
+
+# id(driver) of sessions without a performance log (e.g. attached browsers),
+# so discarding the log costs them no round trip.
+_no_performance_log = set()
+
+# Resource type -> [bytes, count] over every load seen, used to estimate
+# what the blocked requests would have cost.
+_type_sizes = {}
+
+
+def validate_profile(profile, block=None):
+    """Returns an error message for a bad profile/block pair, else None."""
+    if profile is not None and profile not in PROFILES:
+        return f"Unknown profile {profile!r} (expected one of {', '.join(PROFILES)})"
+    if block is not None:
+        if not isinstance(block, list) or not all(isinstance(p, str) and p for p in block):
+            return "'block' must be a list of URL patterns or group names"
+    return None
+
+
+def blocked_patterns(profile: str = DEFAULT_PROFILE, block=None):
+    """URL patterns blocked by a profile plus extra patterns or group names in block."""
+    patterns = []
+    for group in PROFILES[profile or DEFAULT_PROFILE]:
+        patterns += BLOCK_GROUPS[group]
+    for item in block or []:
+        patterns += BLOCK_GROUPS.get(item, [item])
+    # Keep the order, drop duplicates.
+    return list(dict.fromkeys(patterns))
+
+
+def _tab_key(driver):
+    return id(driver), driver.current_window_handle
+
+
+def current_patterns(driver):
+    with _lock:
+        return _applied.get(_tab_key(driver), ())
+
+
+def set_blocked(driver, patterns):
+    """Blocks patterns in the current tab (an empty list unblocks everything)."""
+    patterns = tuple(patterns)
+    key = _tab_key(driver)
+    with _lock:
+        previous = _applied.get(key, ())
+    if patterns == previous:
+        return patterns
+    if patterns or previous:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+    with _lock:
+        _applied[key] = patterns
+    return patterns
+
+
+def apply_profile(driver, profile: str = DEFAULT_PROFILE, block=None):
+    """Applies a named profile (plus extra block patterns) to the current tab."""
+    return set_blocked(driver, blocked_patterns(profile, block))
+
+
+@contextlib.contextmanager
+def use_profile(driver, profile: str = None, block=None):
+    """
+    Applies a profile for the duration of the block, then restores what
+    the tab blocked before. With neither profile nor block it does nothing.
+    """
+    if profile is None and not block:
+        yield current_patterns(driver)
+        return
+    previous = current_patterns(driver)
+    patterns = apply_profile(driver, profile, block)
+    try:
+        yield patterns
+    finally:
+        try:
+            set_blocked(driver, previous)
+        except Exception as e:
+            print(f"[navigation] Could not restore blocked URLs: {e}")
+
+
+def _read_performance_log(driver):
+    """Drains chromedriver's performance log; None if it is not enabled."""
+    if id(driver) in _no_performance_log:
+        return None
+    try:
+        return driver.get_log("performance")
+    except Exception:
+        with _lock:
+            _no_performance_log.add(id(driver))
+        return None
+
+
+def begin(driver):
+    """
+    Discards buffered network events so load_stats() covers one load.
+    chromedriver buffers the log until it is read, so every page load
+    (goto, tab_pool.map_urls) and module run drains it, measured or not.
+    """
+    _read_performance_log(driver)
+
+
+def load_stats(driver):
+    """
+    Request counts since begin(): requests that loaded and their bytes on
+    the wire, and requests that were blocked (by type). Blocked requests
+    are never sent, so their bytes are estimated from the average size of
+    loaded requests of the same type seen so far (run a 'full' load once
+    to seed it). Without the performance log (attached browsers) the
+    counts come from resource timing and blocked counts are None.
+    """
+    entries = _read_performance_log(driver)
+    if entries is None:
+        timing = driver.execute_script(_RESOURCE_TIMING_JS) or {}
+        return {
+            "source": "resource_timing",
+            "requests": timing.get("requests"),
+            "transferred_bytes": timing.get("bytes"),
+            "blocked_requests": None,
+            "blocked_by_type": None,
+            "blocked_bytes_estimate": None,
+        }
+
+    messages = []
+    for entry in entries:
+        try:
+            messages.append(json.loads(entry["message"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    # The log covers every tab; keep the current one when it can be told apart.
+    handle = driver.current_window_handle
+    if any(m.get("webview") == handle for m in messages):
+        messages = [m for m in messages if m.get("webview") == handle]
+
+    types = {}
+    finished = set()
+    transferred = 0
+    blocked = {}
+    for message in messages:
+        inner = message.get("message") or {}
+        method = inner.get("method")
+        params = inner.get("params") or {}
+        request_id = params.get("requestId")
+        if method == "Network.requestWillBeSent":
+            types[request_id] = params.get("type") or "Other"
+        elif method == "Network.loadingFinished":
+            size = int(params.get("encodedDataLength") or 0)
+            finished.add(request_id)
+            transferred += size
+            with _lock:
+                seen = _type_sizes.setdefault(types.get(request_id) or "Other", [0, 0])
+                seen[0] += size
+                seen[1] += 1
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            kind = params.get("type") or types.get(request_id) or "Other"
+            blocked[kind] = blocked.get(kind, 0) + 1
+    return {
+        "source": "performance_log",
+        "requests": len(finished),
+        "transferred_bytes": transferred,
+        "blocked_requests": sum(blocked.values()),
+        "blocked_by_type": blocked,
+        "blocked_bytes_estimate": _estimate_bytes(blocked),
+    }
+
+
+def _estimate_bytes(blocked: dict):
+    """Blocked requests times the average loaded size of their type (None without samples)."""
+    total = 0
+    known = False
+    with _lock:
+        for kind, count in blocked.items():
+            seen = _type_sizes.get(kind)
+            if seen and seen[1]:
+                total += count * seen[0] // seen[1]
+                known = True
+    return total if known else None
+
+
+PAGE_LOAD_MODES = ("normal", "eager", "none")
+
+# Marks the current document so goto() can tell it from the new one.
+_MARK_OLD_DOCUMENT_JS = "window.__bfOldDocument = true;"
+
+_READY_JS = """
+var sel = arguments[0];
+if (window.__bfOldDocument) { return {state: 'pending'}; }
+var match = null;
+if (sel) {
+  try {
+    var first = sel.charAt(0);
+    match = (first === '/' || first === '(')
+      ? document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null
+      : document.querySelector(sel) !== null;
+  } catch (e) { match = false; }
+}
+var n = performance.getEntriesByType('navigation')[0], timing = null;
+if (n) {
+  var ms = function (v) { return v ? Math.round(v) : null; };
+  timing = {
+    response_start: ms(n.responseStart),
+    dom_interactive: ms(n.domInteractive),
+    dom_content_loaded: ms(n.domContentLoadedEventEnd),
+    load_event: ms(n.loadEventEnd),
+    transfer_size: n.transferSize
+  };
+}
+return {state: document.readyState, match: match, url: location.href, timing: timing};
+"""
+
+
+def validate_page_load(page_load, ready_selector=None):
+    """Returns an error message for a bad page_load/ready_selector pair, else None."""
+    if page_load is not None and page_load not in PAGE_LOAD_MODES:
+        return f"Unknown page_load {page_load!r} (expected one of {', '.join(PAGE_LOAD_MODES)})"
+    if ready_selector is not None and (not isinstance(ready_selector, str) or not ready_selector.strip()):
+        return "'ready_selector' must be a non-empty CSS selector or XPath"
+    return None
+
+
+def session_page_load(driver):
+    """The page-load strategy the driver session was started with."""
+    try:
+        return (driver.capabilities or {}).get("pageLoadStrategy") or "normal"
+    except Exception:
+        return "normal"
+
+
+def _reached(state: str, page_load: str):
+    if page_load == "normal":
+        return state == "complete"
+    if page_load == "eager":
+        return state in ("interactive", "complete")
+    return True
+
+
+def goto(driver, url: str, page_load: str = "normal", ready_selector: str = None, timeout: float = 30.0, poll_interval: float = 0.05):
+    """
+    Loads url and returns once it is ready: the load event (normal),
+    DOMContentLoaded (eager), the new document existing (none), or, with
+    ready_selector, as soon as that selector matches. driver.get() itself
+    returns according to the session's strategy (run.py --page-load), so
+    returning before the load event needs a session started with 'none'
+    (or 'eager'); under a 'normal' session every mode costs a full load.
+    Never raises on a readiness timeout; "ready" is False instead.
+    Returns {"page_load", "session_page_load", "ready", "ready_selector",
+    "state", "get_ms", "ready_ms", "timings"} (timings in ms from navigation start).
+    The performance log is drained first, so load_stats() right after
+    covers this load only.
+    """
+    page_load = page_load or "normal"
+    begin(driver)
+    started = time.time()
+    try:
+        driver.execute_script(_MARK_OLD_DOCUMENT_JS)
+    except Exception:
+        pass
+    driver.get(url)
+    get_ms = round((time.time() - started) * 1000, 1)
+
+    deadline = started + float(timeout)
+    status = None
+    ready = False
+    while True:
+        jobs.check_cancelled()
+        try:
+            status = driver.execute_script(_READY_JS, ready_selector)
+        except Exception:
+            # The old document can go away mid-call.
+            status = None
+        if status and status.get("state") != "pending":
+            if ready_selector:
+                ready = bool(status.get("match"))
+            else:
+                ready = _reached(status.get("state"), page_load)
+        if ready or time.time() >= deadline:
+            break
+        time.sleep(poll_interval)
+
+    return {
+        "page_load": page_load,
+        "session_page_load": session_page_load(driver),
+        "ready": ready,
+        "ready_selector": ready_selector,
+        "state": (status or {}).get("state"),
+        "get_ms": get_ms,
+        "ready_ms": round((time.time() - started) * 1000, 1),
+        "timings": (status or {}).get("timing"),
+    }
@@ -0,0 +1,172 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+class ResultSink:
+    """
+    Append-only writer for a {"<root_key>": [...]} JSON results file.
+    New records go to a JSONL journal next to it (data.json -> data.jsonl)
+    in small batches; a set of dedup keys (from the JSON file, read once,
+    plus the journal) makes each add O(1). compact() merges the journal
+    into the JSON file in its usual layout and empties the journal.
+    """
+
+    def __init__(self, json_path: str, key_field: str = None, root_key: str = "products", batch_size: int = 20, flush_interval: float = 2.0):
+        self.json_path = json_path
+        self.journal_path = os.path.splitext(json_path)[0] + ".jsonl"
+        self.key_field = key_field
+        self.root_key = root_key
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._last_flush = time.time()
+        self._keys = set()
+        self._base_count = 0
+        self._journal_count = 0
+        self._load_index()
+
+    def _key(self, record):
+        if not self.key_field:
+            return None
+        return record.get(self.key_field) or None
+
+    def _read_base(self):
+        try:
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"Error loading {self.json_path}: {str(e)}")
+            return []
+        records = data.get(self.root_key) if isinstance(data, dict) else None
+        return records if isinstance(records, list) else []
+
+    def _read_journal(self):
+        records = []
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A torn last line from a crash mid-write.
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _load_index(self):
+        base = self._read_base()
+        journal = self._read_journal()
+        self._base_count = len(base)
+        self._journal_count = len(journal)
+        for record in base + journal:
+            key = self._key(record)
+            if key is not None:
+                self._keys.add(key)
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._keys
+
+    def add(self, record: dict):
+        """Queues record; returns False (and drops it) if its key is already stored."""
+        with self._lock:
+            key = self._key(record)
+            if key is not None:
+                if key in self._keys:
+                    return False
+                self._keys.add(key)
+            self._buffer.append(json.dumps(record, ensure_ascii=False))
+            if len(self._buffer) >= self.batch_size or time.time() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return True
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._buffer:
+                return 0
+            lines = self._buffer
+            self._buffer = []
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_count += len(lines)
+            return len(lines)
+
+    def count(self):
+        with self._lock:
+            return self._base_count + self._journal_count + len(self._buffer)
+
+    def compact(self):
+        """
+        Merges the journal into the JSON file ({root_key: [...]}, indent=2)
+        and empties the journal. The JSON file is re-read here, so edits
+        made to it by other tools are kept.
+        """
+        with self._lock:
+            self.flush()
+            journal = self._read_journal()
+            base = self._read_base()
+            if not journal and os.path.exists(self.json_path):
+                return {"total": len(base), "merged": 0}
+            seen = {self._key(r) for r in base} - {None}
+            merged = 0
+            for record in journal:
+                key = self._key(record)
+                if key is not None and key in seen:
+                    continue
+                if key is not None:
+                    seen.add(key)
+                base.append(record)
+                merged += 1
+            tmp_path = f"{self.json_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({self.root_key: base}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.json_path)
+            # Only now drop the journal: a crash before this line just
+            # means the next compaction merges (and dedups) it again.
+            open(self.journal_path, "w", encoding="utf-8").close()
+            self._base_count = len(base)
+            self._journal_count = 0
+            self._keys |= seen
+            return {"total": len(base), "merged": merged}
+
+    def close(self):
+        self.flush()
+
+
+def open_sink(json_path: str, **kwargs):
+    """Returns the shared ResultSink for json_path, opening it on first use."""
+    path = os.path.abspath(json_path)
+    with _sinks_lock:
+        sink = _sinks.get(path)
+        if sink is None:
+            sink = ResultSink(path, **kwargs)
+            _sinks[path] = sink
+        return sink
+
+
+@atexit.register
+def _flush_all():
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        try:
+            sink.flush()
+        except Exception:
+            pass
@@ -1,4 +1,5 @@
 import undetected_chromedriver as uc
+from selenium import webdriver
 import os
 import argparse
 import json
@@ -8,23 +9,126 @@ import pathlib
 import queue
 import threading
 import traceback
-import inspect
 import time
 import re
 import subprocess
+import heapq
+import urllib.parse
+import urllib.request
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import sys
 
-def kill_relevant_processes():
-    for proc in psutil.process_iter(['pid', 'name']):
+import dom_delta
+import dom_store
+import jobs
+import metrics
+import module_registry
+import navigation
+import tab_pool
+import waits
+
+def _profile_owner_processes(base_dir: str):
+    # Only browsers started on our chrome_profiles dir; other Chrome
+    # instances on the machine are left alone.
+    profiles_root = os.path.join(base_dir, "chrome_profiles")
+    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
         try:
-            process_info = proc.info
-            if process_info['name'] in ['chrome', 'chromedriver']:
-                os.kill(process_info['pid'], 9)
+            for arg in proc.info.get('cmdline') or []:
+                if not arg.startswith("--user-data-dir="):
+                    continue
+                path = os.path.abspath(arg.split("=", 1)[1])
+                if path == profiles_root or path.startswith(profiles_root + os.sep):
+                    yield proc
+                break
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
 
 
+def kill_relevant_processes(base_dir: str = None):
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    for proc in _profile_owner_processes(base_dir):
+        try:
+            os.kill(proc.info['pid'], 9)
+        except (OSError, psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+
+# chromedriver has no --user-data-dir of its own, so the drivers each daemon
+# started are recorded here ({"processes": [{pid, created, daemon_pid}]}).
+CHROMEDRIVER_PIDS_FILE = ".chromedriver_pids.json"
+
+
+def _load_chromedriver_pids(base_dir: str):
+    try:
+        with open(os.path.join(base_dir, CHROMEDRIVER_PIDS_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and isinstance(data.get("processes"), list):
+            return data["processes"]
+    except (OSError, ValueError):
+        pass
+    return []
+
+
+def _save_chromedriver_pids(base_dir: str, entries):
+    path = os.path.join(base_dir, CHROMEDRIVER_PIDS_FILE)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"processes": entries}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not save chromedriver pids ({path}): {e}")
+
+
+def _recorded_process(entry: dict):
+    # None unless entry's pid is still the process that was recorded (pids get reused).
+    try:
+        proc = psutil.Process(int(entry["pid"]))
+        if abs(proc.create_time() - float(entry["created"])) > 1.0:
+            return None
+        return proc
+    except (KeyError, TypeError, ValueError, psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+def remember_chromedriver(base_dir: str, driver):
+    """Records the chromedriver behind driver so a later start can reap it if orphaned."""
+    try:
+        proc = psutil.Process(driver.service.process.pid)
+        entry = {"pid": proc.pid, "created": proc.create_time(), "daemon_pid": os.getpid()}
+    except Exception:
+        return
+    entries = [e for e in _load_chromedriver_pids(base_dir) if _recorded_process(e) is not None]
+    _save_chromedriver_pids(base_dir, entries + [entry])
+
+
+def reap_orphaned_chromedrivers(base_dir: str = None):
+    """
+    Kills recorded chromedrivers whose daemon is gone (a crashed daemon's
+    drivers are re-parented, so their parent is no longer daemon_pid).
+    Drivers of a daemon that is still running are left alone.
+    """
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    kept = []
+    reaped = 0
+    for entry in _load_chromedriver_pids(base_dir):
+        proc = _recorded_process(entry)
+        if proc is None:
+            continue
+        try:
+            if proc.ppid() == entry.get("daemon_pid"):
+                kept.append(entry)
+                continue
+            proc.kill()
+            reaped += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+    _save_chromedriver_pids(base_dir, kept)
+    if reaped:
+        print(f"[Chrome] Killed {reaped} chromedriver process(es) left by a previous run")
+    return reaped
+
+
 def _json_response(handler: BaseHTTPRequestHandler, status: int, payload: dict):
     body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
     handler.send_response(status)
@@ -34,6 +138,15 @@ def _json_response(handler: BaseHTTPRequestHandler, status: int, payload: dict):
     handler.wfile.write(body)
 
 
+def _text_response(handler: BaseHTTPRequestHandler, status: int, text: str, content_type: str):
+    body = text.encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
 def _read_json_body(handler: BaseHTTPRequestHandler):
     length = int(handler.headers.get("Content-Length") or 0)
     raw = handler.rfile.read(length) if length > 0 else b""
@@ -122,6 +235,102 @@ def _extract_current_browser_major_from_error(err_text: str):
     return None
 
 
+DISCOVERY_CACHE_FILE = ".chrome_discovery_cache.json"
+
+
+def _load_discovery_cache(base_dir: str):
+    try:
+        with open(os.path.join(base_dir, DISCOVERY_CACHE_FILE), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            cache.setdefault("binaries", {})
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"binaries": {}}
+
+
+def _save_discovery_cache(base_dir: str, cache: dict):
+    path = os.path.join(base_dir, DISCOVERY_CACHE_FILE)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not save Chrome discovery cache ({path}): {e}")
+
+
+def _binary_fingerprint(path: str):
+    st = os.stat(path)
+    return {"mtime": st.st_mtime, "size": st.st_size}
+
+
+def _cached_repo_chrome(base_dir: str, chrome_dir: str):
+    # Skips the rglob over ./chrome while the binary (or, for a negative
+    # result, the ./chrome listing) is unchanged.
+    cache = _load_discovery_cache(base_dir)
+    entry = cache.get("repo_chrome") or {}
+    try:
+        if entry.get("path"):
+            if _binary_fingerprint(entry["path"]) == entry.get("fingerprint") and os.access(entry["path"], os.X_OK):
+                return entry["path"]
+        elif entry and os.path.isdir(chrome_dir) and os.stat(chrome_dir).st_mtime == entry.get("dir_mtime"):
+            return None
+    except OSError:
+        pass
+
+    found = _discover_chrome_in_repo(chrome_dir)
+    if found:
+        cache["repo_chrome"] = {"path": found, "fingerprint": _binary_fingerprint(found)}
+    elif os.path.isdir(chrome_dir):
+        cache["repo_chrome"] = {"path": None, "dir_mtime": os.stat(chrome_dir).st_mtime}
+    else:
+        cache.pop("repo_chrome", None)
+    _save_discovery_cache(base_dir, cache)
+    return found
+
+
+def _cached_chrome_major(base_dir: str, executable_path: str, probe: bool = True):
+    """
+    Major version of a Chrome binary, cached by path + mtime + size so the
+    browser is only forked with --version when the binary changed.
+    """
+    executable_path = os.path.abspath(executable_path)
+    try:
+        fingerprint = _binary_fingerprint(executable_path)
+    except OSError:
+        return None
+    cache = _load_discovery_cache(base_dir)
+    entry = cache["binaries"].get(executable_path)
+    if entry and entry.get("fingerprint") == fingerprint and entry.get("major"):
+        return entry["major"]
+    if not probe:
+        return None
+    major = _get_chrome_major_version(executable_path)
+    if major:
+        _remember_chrome_major(base_dir, executable_path, major)
+    return major
+
+
+def _remember_chrome_major(base_dir: str, executable_path: str, major: int):
+    executable_path = os.path.abspath(executable_path)
+    try:
+        fingerprint = _binary_fingerprint(executable_path)
+    except OSError:
+        return
+    cache = _load_discovery_cache(base_dir)
+    cache["binaries"][executable_path] = {"fingerprint": fingerprint, "major": int(major)}
+    _save_discovery_cache(base_dir, cache)
+
+
+def _system_chrome_executable():
+    try:
+        return uc.find_chrome_executable()
+    except Exception:
+        return None
+
+
 def _resolve_chrome_executable(base_dir: str, prefer_auto: bool = True):
     chrome_dir = os.path.join(base_dir, "chrome")
     saved_path_file = os.path.join(base_dir, ".chrome_executable_path")
@@ -131,7 +340,7 @@ def _resolve_chrome_executable(base_dir: str, prefer_auto: bool = True):
     if prefer_auto:
         return None
 
-    repo_chrome = _discover_chrome_in_repo(chrome_dir)
+    repo_chrome = _cached_repo_chrome(base_dir, chrome_dir)
     if repo_chrome:
         print(f"[Chrome] Using repo Chrome: {repo_chrome}")
         return repo_chrome
@@ -171,37 +380,711 @@ def _resolve_chrome_executable(base_dir: str, prefer_auto: bool = True):
         return chrome_path
 
 
+_modules = module_registry.ModuleRegistry()
+
+
 def _call_module_main(module_name: str, driver, payload: dict):
-    mod = importlib.import_module(module_name)
-    mod = importlib.reload(mod)
+    # Reuses the imported module unless its source changed on disk.
+    started = time.time()
+    outcome = "failure"
+    try:
+        result = _modules.call(module_name, driver, payload)
+        outcome = "success"
+        return result
+    except jobs.JobCancelled:
+        outcome = "cancelled"
+        raise
+    finally:
+        # Drop the network events the module's page loads left in the log.
+        navigation.begin(driver)
+        # Names that never imported share one series, so clients can't add labels at will.
+        label = module_name if _modules.known(module_name) else "unknown"
+        metrics.MODULE_RUNS.inc(module=label, outcome=outcome)
+        metrics.MODULE_DURATION.observe(time.time() - started, module=label)
+
+
+# Lower rank runs first. Control commands (and the internal snapshot
+# refresh) jump ahead of queued work; async jobs yield to requests
+# someone is waiting on.
+PRIORITIES = {"control": 0, "interactive": 1, "background": 2}
+
+
+class Command:
+    __slots__ = ("fn", "resp_q", "priority", "deadline", "on_expire", "enqueued_at", "seq", "internal")
+
+    def __init__(self, fn, resp_q, priority: str = "interactive", deadline=None, on_expire=None, internal: bool = False):
+        if priority not in PRIORITIES:
+            raise Exception(f"Unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+        self.fn = fn
+        self.resp_q = resp_q
+        self.priority = priority
+        self.deadline = deadline
+        self.on_expire = on_expire
+        self.enqueued_at = time.time()
+        self.seq = 0
+        # Housekeeping the daemon queues itself; left out of /queue and metrics.
+        self.internal = internal
+
+    def sort_key(self):
+        return (PRIORITIES[self.priority], self.seq)
+
+    def expire(self):
+        if self.on_expire is not None:
+            self.on_expire()
+        self.resp_q.put(
+            {
+                "ok": False,
+                "error": "Deadline passed before the command reached a driver",
+                "expired": True,
+            }
+        )
 
-    if not hasattr(mod, "main"):
-        raise Exception(f"Module '{module_name}' does not have a main(driver) function")
 
-    main_fn = getattr(mod, "main")
-    sig = inspect.signature(main_fn)
-    if len(sig.parameters) >= 2:
-        return main_fn(driver, payload)
-    return main_fn(driver)
+class CommandScheduler:
+    """
+    Hands queued Selenium commands to the driver workers.
+    Unpinned commands go to whichever worker is free; commands carrying a
+    session key (or an explicit worker index) always run on the same worker.
+    Within the queues, commands run by priority class, then FIFO. Commands
+    whose deadline has passed are dropped before they reach a driver.
+    """
+
+    def __init__(self, worker_count: int):
+        self.worker_count = max(1, int(worker_count))
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._shared = []
+        self._pinned = [[] for _ in range(self.worker_count)]
+        self._busy_since = [None] * self.worker_count
+        self._sessions = {}
+        self._closed = False
+        self._classes = {
+            name: {
+                "queued": 0,
+                "enqueued": 0,
+                "dispatched": 0,
+                "expired": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0,
+            }
+            for name in PRIORITIES
+        }
+
+    def _load(self, worker_id: int):
+        return len(self._pinned[worker_id]) + (1 if self._busy_since[worker_id] else 0)
+
+    def _resolve_worker(self, session=None, worker=None):
+        if worker is not None:
+            worker_id = int(worker)
+            if worker_id < 0 or worker_id >= self.worker_count:
+                raise Exception(f"Invalid worker {worker_id} (pool has {self.worker_count})")
+            return worker_id
+        if session is None:
+            return None
+        session = str(session)
+        if session not in self._sessions:
+            # Bind new sessions to the least loaded worker.
+            self._sessions[session] = min(range(self.worker_count), key=self._load)
+        return self._sessions[session]
+
+    def put(self, command: Command, session=None, worker=None):
+        with self._cond:
+            if self._closed:
+                raise Exception("Scheduler is shut down")
+            worker_id = self._resolve_worker(session=session, worker=worker)
+            self._seq += 1
+            command.seq = self._seq
+            target = self._shared if worker_id is None else self._pinned[worker_id]
+            heapq.heappush(target, (command.sort_key(), command))
+            if not command.internal:
+                stats = self._classes[command.priority]
+                stats["queued"] += 1
+                stats["enqueued"] += 1
+            self._cond.notify_all()
+            return worker_id
+
+    def _pop_next(self, worker_id: int):
+        pinned = self._pinned[worker_id]
+        if pinned and (not self._shared or pinned[0][0] < self._shared[0][0]):
+            return heapq.heappop(pinned)[1]
+        if self._shared:
+            return heapq.heappop(self._shared)[1]
+        return None
 
+    def get(self, worker_id: int):
+        while True:
+            expired = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        command = None
+                        break
+                    command = self._pop_next(worker_id)
+                    if command is None:
+                        if expired:
+                            break
+                        self._cond.wait()
+                        continue
+                    now = time.time()
+                    if command.internal:
+                        if command.deadline is not None and now > command.deadline:
+                            continue
+                        self._busy_since[worker_id] = now
+                        break
+                    stats = self._classes[command.priority]
+                    stats["queued"] -= 1
+                    if command.deadline is not None and now > command.deadline:
+                        stats["expired"] += 1
+                        expired.append(command)
+                        continue
+                    wait_ms = (now - command.enqueued_at) * 1000.0
+                    stats["dispatched"] += 1
+                    stats["wait_ms_total"] += wait_ms
+                    stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+                    self._busy_since[worker_id] = now
+                    break
+            # Notify callers of dropped commands outside the lock.
+            for dropped in expired:
+                dropped.expire()
+            if command is not None or self._closed:
+                return command
+
+    def done(self, worker_id: int):
+        with self._cond:
+            self._busy_since[worker_id] = None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def busy_since(self, worker_id: int):
+        return self._busy_since[worker_id]
+
+    def session_worker(self, session):
+        with self._cond:
+            return self._sessions.get(str(session))
+
+    def queue_stats(self):
+        with self._cond:
+            out = {}
+            for name, stats in self._classes.items():
+                dispatched = stats["dispatched"]
+                out[name] = dict(
+                    stats,
+                    wait_ms_total=round(stats["wait_ms_total"], 1),
+                    wait_ms_max=round(stats["wait_ms_max"], 1),
+                    wait_ms_avg=round(stats["wait_ms_total"] / dispatched, 1) if dispatched else 0.0,
+                )
+            return out
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.worker_count,
+                "shared_queue": len(self._shared),
+                "pinned_queue": [len(q) for q in self._pinned],
+                "busy": [since is not None for since in self._busy_since],
+                "sessions": dict(self._sessions),
+            }
+
+
+class StateSnapshots:
+    """
+    Last known URL/title of every driver, published by the driver loops so
+    GET /health and GET /state never have to wait for the Selenium thread.
+    """
+
+    def __init__(self, worker_count: int):
+        self._states = [
+            {"current_url": "", "title": "", "updated_at": None, "error": None}
+            for _ in range(worker_count)
+        ]
+
+    def publish(self, worker_id: int, driver):
+        try:
+            state = {
+                "current_url": driver.current_url,
+                "title": driver.title,
+                "updated_at": time.time(),
+                "error": None,
+            }
+        except Exception as e:
+            state = dict(self._states[worker_id], error=str(e))
+        # Replacing the dict is atomic, so readers need no lock.
+        self._states[worker_id] = state
+
+    def get(self, worker_id: int):
+        return self._states[worker_id]
+
+    def age(self, worker_id: int):
+        updated_at = self._states[worker_id]["updated_at"]
+        return None if updated_at is None else time.time() - updated_at
+
+
+def _driver_loop(worker_id: int, driver, scheduler: CommandScheduler, snapshots: StateSnapshots = None):
+    if snapshots is not None:
+        snapshots.publish(worker_id, driver)
+    while True:
+        command = scheduler.get(worker_id)
+        if command is None:
+            return
+        if command.internal:
+            _run_internal(worker_id, driver, command, scheduler, snapshots)
+            continue
+        started = time.time()
+        metrics.QUEUE_WAIT.observe(started - command.enqueued_at, priority=command.priority)
+        outcome = "failure"
+        try:
+            value = command.fn(driver)
+            outcome = "success"
+            command.resp_q.put({"ok": True, "value": value, "worker": worker_id})
+        except Exception as e:
+            command.resp_q.put(
+                {
+                    "ok": False,
+                    "error": str(e),
+                    "traceback": traceback.format_exc(),
+                    "worker": worker_id,
+                }
+            )
+        finally:
+            metrics.BUSY_SECONDS.inc(time.time() - started, worker=worker_id)
+            metrics.COMMANDS.inc(worker=worker_id, outcome=outcome)
+            if snapshots is not None:
+                snapshots.publish(worker_id, driver)
+            scheduler.done(worker_id)
+
+
+def _run_internal(worker_id: int, driver, command: Command, scheduler: CommandScheduler, snapshots: StateSnapshots = None):
+    # Same as a regular command minus the accounting.
+    try:
+        command.fn(driver)
+    except Exception:
+        # A broken driver shows up in the published snapshot's error.
+        pass
+    finally:
+        if snapshots is not None:
+            snapshots.publish(worker_id, driver)
+        scheduler.done(worker_id)
+
+
+def _refresh_snapshots(scheduler: CommandScheduler, snapshots: StateSnapshots, interval_s: float):
+    # Catches changes the loop can't see (redirects, JS navigation) while idle.
+    while not scheduler.closed:
+        time.sleep(interval_s)
+        for worker_id in range(scheduler.worker_count):
+            if scheduler.busy_since(worker_id) is not None:
+                continue
+            age = snapshots.age(worker_id)
+            if age is not None and age < interval_s:
+                continue
+            try:
+                scheduler.put(
+                    Command(
+                        # Also keeps an idle browser's performance log drained.
+                        navigation.begin,
+                        queue.Queue(maxsize=1),
+                        priority="control",
+                        deadline=time.time() + interval_s,
+                        internal=True,
+                    ),
+                    worker=worker_id,
+                )
+            except Exception:
+                return
+
+
+ENDPOINTS = (
+    "/health", "/state", "/workers", "/queue", "/metrics", "/snapshots", "/modules", "/modules/reload",
+    "/navigate", "/save_dom", "/dom_delta", "/run_module", "/batch", "/jobs", "/shutdown",
+)
+
+
+# POST endpoints that queue driver work and so honour session/worker/priority/deadline.
+ROUTED_ENDPOINTS = ("/navigate", "/save_dom", "/dom_delta", "/run_module", "/batch", "/jobs")
+
+
+def _metrics_path(raw_path: str):
+    # Bounded label values: job ids and unknown paths are folded together.
+    path = urllib.parse.urlsplit(raw_path).path
+    if path in ENDPOINTS:
+        return path
+    if path.startswith("/jobs/"):
+        return "/jobs/{id}"
+    return "other"
+
+
+def _routing(payload: dict, default_priority: str = "interactive"):
+    return {
+        "session": payload.get("session"),
+        "worker": payload.get("worker"),
+        "priority": payload.get("priority") or default_priority,
+    }
+
+
+def _validate_routing(payload: dict, worker_count: int):
+    """Returns an error message for a bad worker/priority/deadline, else None."""
+    worker = payload.get("worker")
+    if worker is not None:
+        try:
+            if isinstance(worker, bool) or int(worker) != float(worker):
+                raise ValueError()
+            worker = int(worker)
+        except (TypeError, ValueError):
+            return f"Invalid worker {worker!r}"
+        if worker < 0 or worker >= worker_count:
+            return f"Invalid worker {worker} (pool has {worker_count})"
+    priority = payload.get("priority")
+    if priority and (not isinstance(priority, str) or priority not in PRIORITIES):
+        return f"Unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})"
+    deadline = payload.get("deadline")
+    if deadline is not None:
+        try:
+            float(deadline)
+        except (TypeError, ValueError):
+            return f"Invalid deadline {deadline!r} (expected unix time in seconds)"
+    return None
+
+
+def _deadline(payload: dict, timeout_s=None):
+    # Callers may pass an absolute unix-time deadline; otherwise the command
+    # is worthless once the HTTP caller stops waiting for it.
+    deadline = payload.get("deadline")
+    if deadline is not None:
+        return float(deadline)
+    if timeout_s is not None:
+        return time.time() + float(timeout_s)
+    return None
+
+
+def _call_module_with_profile(module_name: str, driver, payload: dict):
+    profile = payload.get("profile")
+    block = payload.get("block")
+    if profile is None and not block:
+        return _call_module_main(module_name, driver, payload)
+    # Page loads done by the module itself go through the profile too.
+    with navigation.use_profile(driver, profile, block):
+        return _call_module_main(module_name, driver, payload)
+
+
+def _call_module_in_tab(module_name: str, driver, payload: dict, tabs: int):
+    tab_key = payload.get("tab")
+    if tab_key is True:
+        tab_key = None
+    pool = tab_pool.pool_for(driver, tabs)
+    with pool.lease(tab_key) as handle:
+        result = _call_module_with_profile(module_name, driver, payload)
+    return {"tab": handle, "result": result} if payload.get("tab_info") else result
+
+
+def _normalize_url(url: str):
+    url = (url or "").strip()
+    if url and not url.startswith("http"):
+        url = "https://" + url
+    return url
+
+
+def _navigate(driver, url: str, wait_seconds=None, wait_for=None, profile=None, block=None, load=None):
+    load = load or {}
+    profile_name = profile or ("custom" if block else navigation.DEFAULT_PROFILE)
+    page_load = load.get("page_load") or "normal"
+    if wait_for and "network_idle" in waits.spec_kinds(wait_for):
+        # Track requests from the start of the new document.
+        waits.install_network_tracker(driver)
+    try:
+        with navigation.use_profile(driver, profile, block) as patterns:
+            load_result = navigation.goto(
+                driver,
+                url,
+                page_load=page_load,
+                ready_selector=load.get("ready_selector"),
+                timeout=float(load.get("ready_timeout") or 30.0),
+            )
+    except Exception:
+        metrics.NAVIGATIONS.inc(profile=profile_name, page_load=page_load, outcome="error")
+        raise
+    network = navigation.load_stats(driver)
+    metrics.NAVIGATIONS.inc(
+        profile=profile_name, page_load=page_load, outcome="ready" if load_result["ready"] else "timeout"
+    )
+    metrics.NAVIGATION_DURATION.observe(load_result["ready_ms"] / 1000.0, page_load=page_load)
+    metrics.NAVIGATION_BYTES.inc(network.get("transferred_bytes") or 0, profile=profile_name)
+    metrics.NAVIGATION_BLOCKED.inc(network.get("blocked_requests") or 0, profile=profile_name)
+    result = {
+        "load": load_result,
+        "profile": profile_name,
+        "blocked_patterns": len(patterns),
+        "network": network,
+    }
+    if wait_for:
+        result["wait"] = waits.wait_for(driver, wait_for)
+    if wait_seconds is not None:
+        time.sleep(float(wait_seconds))
+    return {"current_url": driver.current_url, "title": driver.title, **result}
+
+
+def _dom_output_path(base_dir: str, payload: dict):
+    filename = (payload.get("filename") or "page_dom.txt").strip() or "page_dom.txt"
+    return os.path.join(base_dir, filename)
+
+
+def _reduce_options(base_dir: str, payload: dict):
+    reduce = payload.get("reduce")
+    if not reduce:
+        return None
+    options = dict(reduce) if isinstance(reduce, dict) else {}
+    # Keep the reduced copy inside the repo root, like page_dom.txt.
+    if options.get("filename"):
+        options["filename"] = _dom_output_path(base_dir, options)
+    return options or True
+
+
+def _save_dom(driver, base_dir: str, payload: dict):
+    out_path = _dom_output_path(base_dir, payload)
+    value = _call_module_main(
+        "save_dom",
+        driver,
+        {"filename": out_path, "snapshot": payload.get("snapshot"), "reduce": _reduce_options(base_dir, payload)},
+    )
+    _observe_snapshot(value)
+    return {
+        "result": value,
+        "page_dom_path": out_path,
+        "snapshot_id": (value or {}).get("snapshot_id"),
+        "reduced_path": ((value or {}).get("reduced") or {}).get("path"),
+    }
+
+
+def _observe_snapshot(value):
+    value = value or {}
+    if value.get("chars") is not None:
+        metrics.DOM_SNAPSHOT_SIZE.observe(value["chars"], kind="full")
+    if (value.get("reduced") or {}).get("chars") is not None:
+        metrics.DOM_SNAPSHOT_SIZE.observe(value["reduced"]["chars"], kind="reduced")
+
+
+def _dom_delta(driver, base_dir: str, payload: dict):
+    out_path = _dom_output_path(base_dir, payload)
+    result = dom_delta.checkpoint(
+        driver,
+        filename=out_path,
+        max_records=int(payload.get("max_records") or dom_delta.DEFAULT_MAX_RECORDS),
+        max_bytes=int(payload.get("max_bytes") or dom_delta.DEFAULT_MAX_BYTES),
+    )
+    if result.get("mode") == "delta":
+        metrics.DOM_SNAPSHOT_SIZE.observe(result.get("bytes") or 0, kind="delta")
+    else:
+        _observe_snapshot(result.get("snapshot"))
+    return result
+
+
+def _module_fn(module_name: str, payload: dict, tabs: int):
+    if payload.get("tab") is not None:
+        return lambda d: _call_module_in_tab(module_name, d, payload, tabs)
+    return lambda d: _call_module_with_profile(module_name, d, payload)
+
+
+BATCH_OPS = ("navigate", "save_dom", "dom_delta", "run_module")
+
+
+def _validate_batch(steps):
+    if not isinstance(steps, list) or not steps:
+        return "Missing 'steps' (non-empty list)"
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict):
+            return f"Step {index} must be an object"
+        op = step.get("op")
+        if op not in BATCH_OPS:
+            return f"Step {index}: unknown op {op!r} (expected one of {', '.join(BATCH_OPS)})"
+        if op == "navigate" and not _normalize_url(step.get("url")):
+            return f"Step {index}: missing 'url'"
+        if op == "navigate" and step.get("wait_for"):
+            error = waits.validate_spec(step["wait_for"])
+            if error:
+                return f"Step {index}: {error}"
+        if op in ("navigate", "run_module"):
+            error = navigation.validate_profile(step.get("profile"), step.get("block"))
+            if error:
+                return f"Step {index}: {error}"
+        if op == "navigate":
+            error = navigation.validate_page_load(step.get("page_load"), step.get("ready_selector"))
+            if error:
+                return f"Step {index}: {error}"
+        if op == "run_module" and not (step.get("module") or "").strip():
+            return f"Step {index}: missing 'module'"
+    return None
 
-def run_bot_api(driver, host: str, port: int, base_dir: str):
-    command_q: queue.Queue = queue.Queue()
-    stop_event = threading.Event()
 
-    def submit_raw(fn, timeout_s: float = 300.0):
+def _run_batch_step(driver, step: dict, base_dir: str, tabs: int):
+    op = step.get("op")
+    if op == "navigate":
+        return _navigate(
+            driver,
+            _normalize_url(step.get("url")),
+            step.get("wait_seconds"),
+            step.get("wait_for"),
+            step.get("profile"),
+            step.get("block"),
+            step,
+        )
+    if op == "save_dom":
+        return _save_dom(driver, base_dir, step)
+    if op == "dom_delta":
+        return _dom_delta(driver, base_dir, step)
+    if op == "run_module":
+        return _module_fn(step["module"].strip(), step, tabs)(driver)
+    raise Exception(f"Unknown op {op!r}")
+
+
+def _run_batch(driver, steps, base_dir: str, tabs: int, continue_on_error: bool = False):
+    """
+    Runs the steps back to back in one Selenium-loop turn. Stops at the
+    first failure unless continue_on_error is set; skipped steps are still
+    reported so every step has a result.
+    """
+    results = []
+    failed = False
+    for index, step in enumerate(steps):
+        op = step.get("op")
+        if failed and not continue_on_error:
+            results.append({"index": index, "op": op, "ok": False, "skipped": True})
+            continue
+        jobs.check_cancelled()
+        started = time.time()
+        try:
+            value = _run_batch_step(driver, step, base_dir, tabs)
+            results.append(
+                {
+                    "index": index,
+                    "op": op,
+                    "ok": True,
+                    "result": value,
+                    "elapsed_ms": round((time.time() - started) * 1000, 1),
+                }
+            )
+        except jobs.JobCancelled:
+            raise
+        except Exception as e:
+            failed = True
+            results.append(
+                {
+                    "index": index,
+                    "op": op,
+                    "ok": False,
+                    "error": str(e),
+                    "traceback": traceback.format_exc(),
+                    "elapsed_ms": round((time.time() - started) * 1000, 1),
+                }
+            )
+    return {"ok": not failed, "steps": results}
+
+
+def run_bot_api(
+    drivers,
+    host: str,
+    port: int,
+    base_dir: str,
+    tabs: int = 1,
+    snapshot_refresh_s: float = 2.0,
+    startup=None,
+):
+    if not isinstance(drivers, (list, tuple)):
+        drivers = [drivers]
+    scheduler = CommandScheduler(len(drivers))
+    snapshots = StateSnapshots(len(drivers))
+    job_table = jobs.JobTable()
+    worker_of = {id(d): worker_id for worker_id, d in enumerate(drivers)}
+
+    # Read from the scheduler and job table when /metrics is scraped.
+    metrics.gauge(
+        "bot_queue_depth",
+        "Commands waiting for a driver, by priority class.",
+        ("priority",),
+        collect=lambda: [((name,), c["queued"]) for name, c in scheduler.queue_stats().items()],
+    )
+    metrics.counter(
+        "bot_commands_expired_total",
+        "Commands dropped because their deadline passed while queued.",
+        ("priority",),
+        collect=lambda: [((name,), c["expired"]) for name, c in scheduler.queue_stats().items()],
+    )
+    metrics.gauge(
+        "bot_worker_busy",
+        "1 while a driver loop is running a command.",
+        ("worker",),
+        collect=lambda: [((w,), 1 if busy else 0) for w, busy in enumerate(scheduler.stats()["busy"])],
+    )
+    metrics.gauge(
+        "bot_jobs",
+        "Jobs in the job table, by status.",
+        ("status",),
+        collect=lambda: [((status,), n) for status, n in job_table.counts().items()],
+    )
+
+    def submit_raw(fn, timeout_s: float = 300.0, session=None, worker=None, priority="interactive", deadline=None):
         resp_q: queue.Queue = queue.Queue(maxsize=1)
-        command_q.put((fn, resp_q))
+        if deadline is None:
+            deadline = time.time() + timeout_s
+        scheduler.put(
+            Command(fn, resp_q, priority=priority, deadline=deadline),
+            session=session,
+            worker=worker,
+        )
         try:
             return resp_q.get(timeout=timeout_s)
         except queue.Empty:
             raise Exception("Timed out waiting for Selenium command to finish")
 
-    def submit(fn, timeout_s: float = 300.0):
-        resp = submit_raw(fn, timeout_s=timeout_s)
-        if not resp.get("ok"):
-            raise Exception(resp.get("error") or "Selenium command failed")
-        return resp.get("value")
+    def submit_job(kind: str, fn, payload: dict, priority: str = "interactive", deadline=None):
+        job = job_table.create(kind, payload)
+        routing = _routing(payload, default_priority=priority)
+        try:
+            scheduler.put(
+                Command(
+                    lambda d: jobs.run_job(job, fn, d, worker=worker_of.get(id(d))),
+                    queue.Queue(maxsize=1),
+                    priority=routing.pop("priority"),
+                    deadline=deadline,
+                    on_expire=lambda: job_table.cancel(
+                        job.id, reason="Deadline passed before the job reached a driver"
+                    ),
+                ),
+                **routing,
+            )
+        except Exception:
+            job_table.cancel(job.id)
+            raise
+        return job
+
+    def submit_module_job(module_name: str, payload: dict, **kwargs):
+        return submit_job("run_module", _module_fn(module_name, payload, tabs), payload, **kwargs)
+
+    def submit_batch_job(payload: dict, **kwargs):
+        steps = payload.get("steps")
+        continue_on_error = bool(payload.get("continue_on_error"))
+        return submit_job(
+            "batch",
+            lambda d: _run_batch(d, steps, base_dir, tabs, continue_on_error=continue_on_error),
+            payload,
+            **kwargs,
+        )
+
+    def worker_state(worker_id: int):
+        snapshot = snapshots.get(worker_id)
+        age = snapshots.age(worker_id)
+        busy_since = scheduler.busy_since(worker_id)
+        return {
+            "state": {"current_url": snapshot["current_url"], "title": snapshot["title"]},
+            "state_age_s": None if age is None else round(age, 3),
+            "state_error": snapshot["error"],
+            "busy": busy_since is not None,
+            "busy_for_s": None if busy_since is None else round(time.time() - busy_since, 3),
+        }
 
     def make_handler():
         class Handler(BaseHTTPRequestHandler):
@@ -209,92 +1092,199 @@ def run_bot_api(driver, host: str, port: int, base_dir: str):
                 # Keep default HTTP logs minimal; important info is returned in JSON.
                 return
 
+            def send_response(self, code, message=None):
+                self._status = code
+                super().send_response(code, message)
+
+            def _observed(self, method: str, handle):
+                started = time.time()
+                self._status = None
+                try:
+                    handle()
+                finally:
+                    path = _metrics_path(self.path)
+                    metrics.HTTP_REQUESTS.inc(method=method, path=path, status=self._status or 0)
+                    metrics.HTTP_LATENCY.observe(time.time() - started, method=method, path=path)
+
             def do_GET(self):
-                if self.path == "/health":
+                self._observed("GET", self._handle_get)
+
+            def do_DELETE(self):
+                self._observed("DELETE", self._handle_delete)
+
+            def do_POST(self):
+                self._observed("POST", self._handle_post)
+
+            def _handle_get(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                path = parsed.path
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+
+                if path == "/metrics":
+                    # Reads counters only; never touches the driver loop.
+                    _text_response(self, 200, metrics.render(), metrics.CONTENT_TYPE)
+                    return
+
+                if path == "/health":
+                    _json_response(
+                        self,
+                        200,
+                        {
+                            "ok": True,
+                            "mode": "bot",
+                            "host": host,
+                            "port": port,
+                            "base_dir": base_dir,
+                            "page_dom_path": os.path.join(base_dir, "page_dom.txt"),
+                            "workers": scheduler.worker_count,
+                            "startup": startup or [],
+                            **worker_state(0),
+                        },
+                    )
+                    return
+
+                if path == "/state":
+                    if "session" in query:
+                        worker_id = scheduler.session_worker(query["session"])
+                        if worker_id is None:
+                            _json_response(self, 404, {"ok": False, "error": "Unknown session"})
+                            return
+                    else:
+                        worker_id = query.get("worker", 0)
                     try:
-                        state = submit(
-                            lambda d: {
-                                "current_url": getattr(d, "current_url", ""),
-                                "title": getattr(d, "title", ""),
-                            },
-                            timeout_s=10.0,
-                        )
+                        worker_id = int(worker_id)
+                        if worker_id < 0 or worker_id >= scheduler.worker_count:
+                            raise ValueError()
+                    except ValueError:
+                        _json_response(self, 400, {"ok": False, "error": "Invalid worker"})
+                        return
+                    _json_response(self, 200, {"ok": True, "worker": worker_id, **worker_state(worker_id)})
+                    return
+
+                if path == "/workers":
+                    _json_response(self, 200, {"ok": True, "scheduler": scheduler.stats()})
+                    return
+
+                if path == "/queue":
+                    _json_response(self, 200, {"ok": True, "classes": scheduler.queue_stats()})
+                    return
+
+                if path == "/snapshots":
+                    try:
+                        store = dom_store.open_store(os.path.join(base_dir, dom_store.DEFAULT_DIR_NAME))
                         _json_response(
                             self,
                             200,
                             {
                                 "ok": True,
-                                "mode": "bot",
-                                "host": host,
-                                "port": port,
-                                "base_dir": base_dir,
-                                "page_dom_path": os.path.join(base_dir, "page_dom.txt"),
-                                "state": state,
+                                "store": store.stats(),
+                                "captures": store.captures(
+                                    url=query.get("url"),
+                                    limit=int(query.get("limit") or 50),
+                                ),
                             },
                         )
                     except Exception as e:
                         _json_response(self, 500, {"ok": False, "error": str(e)})
                     return
 
-                if self.path == "/state":
-                    try:
-                        state = submit(
-                            lambda d: {
-                                "current_url": getattr(d, "current_url", ""),
-                                "title": getattr(d, "title", ""),
-                            },
-                            timeout_s=10.0,
-                        )
-                        _json_response(self, 200, {"ok": True, "state": state})
-                    except Exception as e:
-                        _json_response(self, 500, {"ok": False, "error": str(e)})
+                if path == "/modules":
+                    _json_response(self, 200, {"ok": True, "modules": _modules.stats()})
+                    return
+
+                if path == "/jobs":
+                    _json_response(
+                        self,
+                        200,
+                        {
+                            "ok": True,
+                            "counts": job_table.counts(),
+                            "jobs": [job.to_dict(include_result=False) for job in job_table.list()],
+                        },
+                    )
+                    return
+
+                if path.startswith("/jobs/"):
+                    job = job_table.get(path[len("/jobs/"):])
+                    if job is None:
+                        _json_response(self, 404, {"ok": False, "error": "Unknown job"})
+                        return
+                    _json_response(self, 200, {"ok": True, "job": job.to_dict()})
                     return
 
                 _json_response(self, 404, {"ok": False, "error": "Not found"})
 
-            def do_POST(self):
+            def _handle_delete(self):
+                path = urllib.parse.urlsplit(self.path).path
+                if path.startswith("/jobs/"):
+                    job = job_table.cancel(path[len("/jobs/"):])
+                    if job is None:
+                        _json_response(self, 404, {"ok": False, "error": "Unknown job"})
+                        return
+                    _json_response(self, 200, {"ok": True, "job": job.to_dict(include_result=False)})
+                    return
+
+                _json_response(self, 404, {"ok": False, "error": "Not found"})
+
+            def _handle_post(self):
                 try:
                     payload = _read_json_body(self)
                 except Exception as e:
                     _json_response(self, 400, {"ok": False, "error": str(e)})
                     return
 
+                if self.path in ROUTED_ENDPOINTS:
+                    # Bad routing is the client's fault; catch it before anything is queued.
+                    error = _validate_routing(payload, scheduler.worker_count)
+                    if error:
+                        _json_response(self, 400, {"ok": False, "error": error})
+                        return
+
                 if self.path == "/navigate":
-                    url = (payload.get("url") or "").strip()
+                    url = _normalize_url(payload.get("url"))
                     wait_seconds = payload.get("wait_seconds")
+                    wait_for = payload.get("wait_for")
+                    profile = payload.get("profile")
+                    block = payload.get("block")
                     if not url:
                         _json_response(self, 400, {"ok": False, "error": "Missing 'url'"})
                         return
-                    if not url.startswith("http"):
-                        url = "https://" + url
+                    wait_error = waits.validate_spec(wait_for) if wait_for else None
+                    if wait_error:
+                        _json_response(self, 400, {"ok": False, "error": wait_error})
+                        return
+                    profile_error = navigation.validate_profile(profile, block) or navigation.validate_page_load(
+                        payload.get("page_load"), payload.get("ready_selector")
+                    )
+                    if profile_error:
+                        _json_response(self, 400, {"ok": False, "error": profile_error})
+                        return
 
                     try:
-                        result = submit(
-                            lambda d: (
-                                d.get(url),
-                                time.sleep(float(wait_seconds))
-                                if wait_seconds is not None
-                                else None,
-                                {"current_url": d.current_url, "title": d.title},
-                            )[-1],
+                        resp = submit_raw(
+                            lambda d: _navigate(d, url, wait_seconds, wait_for, profile, block, payload),
                             timeout_s=300.0,
+                            deadline=_deadline(payload),
+                            **_routing(payload),
+                        )
+                        if not resp.get("ok"):
+                            raise Exception(resp.get("error") or "Selenium command failed")
+                        _json_response(
+                            self,
+                            200,
+                            {"ok": True, "result": resp.get("value"), "worker": resp.get("worker")},
                         )
-                        _json_response(self, 200, {"ok": True, "result": result})
                     except Exception as e:
                         _json_response(self, 500, {"ok": False, "error": str(e)})
                     return
 
                 if self.path == "/save_dom":
-                    filename = (payload.get("filename") or "page_dom.txt").strip() or "page_dom.txt"
-                    out_path = os.path.join(base_dir, filename)
                     try:
                         resp = submit_raw(
-                            lambda d: _call_module_main(
-                                "save_dom",
-                                d,
-                                {"filename": out_path},
-                            ),
+                            lambda d: _save_dom(d, base_dir, payload),
                             timeout_s=120.0,
+                            deadline=_deadline(payload),
+                            **_routing(payload),
                         )
                         if not resp.get("ok"):
                             _json_response(
@@ -304,17 +1294,43 @@ def run_bot_api(driver, host: str, port: int, base_dir: str):
                                     "ok": False,
                                     "error": resp.get("error") or "save_dom failed",
                                     "traceback": resp.get("traceback"),
+                                    "worker": resp.get("worker"),
                                 },
                             )
                             return
                         _json_response(
                             self,
                             200,
-                            {
-                                "ok": True,
-                                "result": resp.get("value"),
-                                "page_dom_path": out_path,
-                            },
+                            {"ok": True, **resp.get("value"), "worker": resp.get("worker")},
+                        )
+                    except Exception as e:
+                        _json_response(self, 500, {"ok": False, "error": str(e)})
+                    return
+
+                if self.path == "/dom_delta":
+                    try:
+                        resp = submit_raw(
+                            lambda d: _dom_delta(d, base_dir, payload),
+                            timeout_s=120.0,
+                            deadline=_deadline(payload),
+                            **_routing(payload),
+                        )
+                        if not resp.get("ok"):
+                            _json_response(
+                                self,
+                                500,
+                                {
+                                    "ok": False,
+                                    "error": resp.get("error") or "dom_delta failed",
+                                    "traceback": resp.get("traceback"),
+                                    "worker": resp.get("worker"),
+                                },
+                            )
+                            return
+                        _json_response(
+                            self,
+                            200,
+                            {"ok": True, **resp.get("value"), "worker": resp.get("worker")},
                         )
                     except Exception as e:
                         _json_response(self, 500, {"ok": False, "error": str(e)})
@@ -325,32 +1341,112 @@ def run_bot_api(driver, host: str, port: int, base_dir: str):
                     if not module_name:
                         _json_response(self, 400, {"ok": False, "error": "Missing 'module'"})
                         return
+                    profile_error = navigation.validate_profile(payload.get("profile"), payload.get("block"))
+                    if profile_error:
+                        _json_response(self, 400, {"ok": False, "error": profile_error})
+                        return
                     try:
-                        resp = submit_raw(
-                            lambda d: _call_module_main(module_name, d, payload),
-                            timeout_s=float(payload.get("timeout_seconds") or 600.0),
+                        timeout_s = float(payload.get("timeout_seconds") or 600.0)
+                        job = submit_module_job(module_name, payload, deadline=_deadline(payload, timeout_s))
+                        if not job.done_event.wait(timeout=timeout_s):
+                            # Ask the module to stop instead of letting it hold the driver.
+                            job_table.cancel(job.id)
+                            raise Exception(
+                                f"Timed out waiting for Selenium command to finish (job {job.id} cancelled)"
+                            )
+                        if job.status != jobs.SUCCEEDED:
+                            _json_response(
+                                self,
+                                500,
+                                {
+                                    "ok": False,
+                                    "error": job.error or "run_module failed",
+                                    "traceback": job.traceback,
+                                    "worker": job.worker,
+                                },
+                            )
+                            return
+                        _json_response(
+                            self,
+                            200,
+                            {"ok": True, "result": job.result, "worker": job.worker},
                         )
-                        if not resp.get("ok"):
+                    except Exception as e:
+                        _json_response(self, 500, {"ok": False, "error": str(e)})
+                    return
+
+                if self.path == "/batch":
+                    error = _validate_batch(payload.get("steps"))
+                    if error:
+                        _json_response(self, 400, {"ok": False, "error": error})
+                        return
+                    try:
+                        timeout_s = float(payload.get("timeout_seconds") or 600.0)
+                        job = submit_batch_job(payload, deadline=_deadline(payload, timeout_s))
+                        if not job.done_event.wait(timeout=timeout_s):
+                            job_table.cancel(job.id)
+                            raise Exception(
+                                f"Timed out waiting for batch to finish (job {job.id} cancelled)"
+                            )
+                        if job.status != jobs.SUCCEEDED:
                             _json_response(
                                 self,
                                 500,
                                 {
                                     "ok": False,
-                                    "error": resp.get("error") or "run_module failed",
-                                    "traceback": resp.get("traceback"),
+                                    "error": job.error or "batch failed",
+                                    "traceback": job.traceback,
+                                    "worker": job.worker,
                                 },
                             )
                             return
-                        _json_response(self, 200, {"ok": True, "result": resp.get("value")})
+                        batch = job.result
+                        _json_response(
+                            self,
+                            200 if batch["ok"] else 500,
+                            {"ok": batch["ok"], "steps": batch["steps"], "worker": job.worker},
+                        )
                     except Exception as e:
                         _json_response(self, 500, {"ok": False, "error": str(e)})
                     return
 
+                if self.path == "/jobs":
+                    module_name = (payload.get("module") or "").strip()
+                    is_batch = not module_name and "steps" in payload
+                    if is_batch:
+                        error = _validate_batch(payload.get("steps"))
+                    else:
+                        error = None if module_name else "Missing 'module' (or 'steps' for a batch job)"
+                        error = error or navigation.validate_profile(payload.get("profile"), payload.get("block"))
+                    if error:
+                        _json_response(self, 400, {"ok": False, "error": error})
+                        return
+                    try:
+                        kwargs = {"priority": "background", "deadline": _deadline(payload)}
+                        if is_batch:
+                            job = submit_batch_job(payload, **kwargs)
+                        else:
+                            job = submit_module_job(module_name, payload, **kwargs)
+                        _json_response(
+                            self,
+                            202,
+                            {"ok": True, "job": job.to_dict(include_result=False)},
+                        )
+                    except Exception as e:
+                        _json_response(self, 503, {"ok": False, "error": str(e)})
+                    return
+
+                if self.path == "/modules/reload":
+                    module_name = (payload.get("module") or "").strip() or None
+                    reloaded = _modules.reload(module_name)
+                    ok = all("error" not in item for item in reloaded)
+                    _json_response(self, 200 if ok else 500, {"ok": ok, "modules": reloaded})
+                    return
+
                 if self.path == "/shutdown":
                     try:
-                        stop_event.set()
-                        # Wake the Selenium loop if it's waiting.
-                        command_q.put((lambda d: None, queue.Queue(maxsize=1)))
+                        # Wake every driver loop that is waiting for work.
+                        scheduler.close()
                         _json_response(self, 200, {"ok": True})
                     finally:
                         # ThreadingHTTPServer handles requests in worker threads;
@@ -368,28 +1464,48 @@ def run_bot_api(driver, host: str, port: int, base_dir: str):
     server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
     server_thread.start()
 
-    print(f"[bot] API listening on http://{host}:{port}")
+    print(f"[bot] API listening on http://{host}:{port} ({len(drivers)} worker(s))")
     print("[bot] GET  /health")
-    print("[bot] POST /navigate   {url, wait_seconds?}")
-    print("[bot] POST /save_dom   {filename?}")
-    print("[bot] POST /run_module {module, ...payload}")
+    print("[bot] GET  /state      ?session=&worker=")
+    print("[bot] GET  /workers")
+    print("[bot] GET  /queue")
+    print("[bot] GET  /metrics    (Prometheus text format)")
+    print("[bot] POST /navigate   {url, page_load?, ready_selector?, wait_for?, wait_seconds?, profile?, block?, session?, worker?}")
+    print("[bot] POST /save_dom   {filename?, reduce?, session?, worker?}")
+    print("[bot] POST /dom_delta  {filename?, max_records?, max_bytes?, session?, worker?}")
+    print("[bot] POST /run_module {module, session?, worker?, tab?, profile?, block?, ...payload}")
+    print("[bot] GET  /snapshots  ?url=&limit=")
+    print("[bot] GET  /modules")
+    print("[bot] POST /modules/reload {module?}")
+    print("[bot] POST /batch      {steps: [{op, ...}], continue_on_error?}")
+    print("[bot] POST /jobs       {module | steps, ...payload} -> job id")
+    print("[bot] GET  /jobs/{id}")
+    print("[bot] DELETE /jobs/{id}")
     print("[bot] POST /shutdown")
 
+    # Worker 0 keeps running on the main thread; extra drivers get their own.
+    worker_threads = []
+    for worker_id, worker_driver in enumerate(drivers[1:], start=1):
+        t = threading.Thread(
+            target=_driver_loop,
+            args=(worker_id, worker_driver, scheduler, snapshots),
+            daemon=True,
+        )
+        t.start()
+        worker_threads.append(t)
+
+    threading.Thread(
+        target=_refresh_snapshots,
+        args=(scheduler, snapshots, snapshot_refresh_s),
+        daemon=True,
+    ).start()
+
     try:
-        while not stop_event.is_set():
-            fn, resp_q = command_q.get()
-            try:
-                value = fn(driver)
-                resp_q.put({"ok": True, "value": value})
-            except Exception as e:
-                resp_q.put(
-                    {
-                        "ok": False,
-                        "error": str(e),
-                        "traceback": traceback.format_exc(),
-                    }
-                )
+        _driver_loop(0, drivers[0], scheduler, snapshots)
     finally:
+        scheduler.close()
+        for t in worker_threads:
+            t.join(timeout=5.0)
         try:
             httpd.shutdown()
         except Exception:
@@ -402,8 +1518,128 @@ def run_bot_api(driver, host: str, port: int, base_dir: str):
 
 
 # ---------------------------------------------
-def start_browser():
+# -------------------------- profiles here ---------------------------------
+PROFILE_DIR = "profile_name_1"
+# PROFILE_DIR = "profile_name_2"
+# PROFILE_DIR = "profile_name_3"
+# PROFILE_DIR = "profile_name_4"
+# PROFILE_DIR = "profile_name_5"
+# PROFILE_DIR = "profile_name_6"
+# --------------------------------------------------------------------------
+
+
+def _worker_user_data_dir(base_dir: str, worker_id: int = 0):
+    # Chrome locks a whole user data dir, so every pool worker needs its own.
+    # Worker 0 keeps the original location.
+    user_data_dir = os.path.join(base_dir, "chrome_profiles")
+    if worker_id:
+        user_data_dir = os.path.join(user_data_dir, f"worker_{worker_id}")
+    return user_data_dir
+
+
+def _devtools_alive(port: int):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1.0) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
+
+def _profile_lock_pid(user_data_dir: str):
+    # Chrome's SingletonLock is a symlink to "<hostname>-<pid>".
+    try:
+        target = os.readlink(os.path.join(user_data_dir, "SingletonLock"))
+    except OSError:
+        return None
+    m = re.search(r"-(\d+)$", target)
+    return int(m.group(1)) if m else None
+
+
+def _find_debuggable_chrome(user_data_dir: str):
+    """
+    Returns the remote-debugging port of a Chrome that is still running on
+    user_data_dir, or None. Chrome writes the port to DevToolsActivePort.
+    """
+    try:
+        with open(os.path.join(user_data_dir, "DevToolsActivePort"), "r", encoding="utf-8") as f:
+            port = int(f.readline().strip())
+    except (OSError, ValueError):
+        return None
+    pid = _profile_lock_pid(user_data_dir)
+    if pid is not None and not psutil.pid_exists(pid):
+        return None
+    return port if _devtools_alive(port) else None
+
+
+def _launch_debuggable_chrome(base_dir: str, user_data_dir: str, port: int, timeout_s: float = 20.0):
+    chrome_path = _system_chrome_executable()
+    if not chrome_path:
+        chrome_path = _resolve_chrome_executable(base_dir, prefer_auto=False)
+
+    # Started in its own session so it outlives daemon restarts.
+    subprocess.Popen(
+        [
+            str(chrome_path),
+            f"--remote-debugging-port={port}",
+            f"--user-data-dir={user_data_dir}",
+            f"--profile-directory={PROFILE_DIR}",
+            "--disable-gpu",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-blink-features=AutomationControlled",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if _devtools_alive(port):
+            return port
+        time.sleep(0.2)
+    raise Exception(f"Chrome did not open remote debugging port {port} within {timeout_s}s")
+
+
+def attach_browser(worker_id: int = 0, debug_port: int = 9222, info: dict = None, page_load: str = "normal"):
+    """
+    Attaches to the Chrome that already owns this worker's profile (found
+    through DevToolsActivePort and the profile lock), launching a detached
+    one on debug_port + worker_id if none is running. The browser is not
+    owned by chromedriver, so driver.quit() leaves it running for the next
+    start.
+    """
     base_dir = os.path.dirname(os.path.abspath(__file__))
+    user_data_dir = _worker_user_data_dir(base_dir, worker_id)
+    if not os.path.exists(user_data_dir):
+        os.makedirs(user_data_dir)
+
+    port = _find_debuggable_chrome(user_data_dir)
+    if port:
+        print(f"[Chrome] Attaching to running Chrome on port {port}")
+        mode = "attach"
+    else:
+        port = debug_port + worker_id
+        print(f"[Chrome] No running Chrome on this profile; launching one on port {port}...")
+        _launch_debuggable_chrome(base_dir, user_data_dir, port)
+        mode = "attach_launched"
+
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"127.0.0.1:{port}"
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.page_load_strategy = page_load
+    driver = webdriver.Chrome(options=options)
+    if info is not None:
+        info.update({"mode": mode, "debug_port": port, "page_load": page_load})
+    return driver
+
+
+def start_browser(worker_id: int = 0, info: dict = None, page_load: str = "normal"):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if info is not None:
+        info["mode"] = "launch"
+        info["page_load"] = page_load
 
     def build_options():
         # NOTE: undetected_chromedriver does not allow reusing a ChromeOptions
@@ -414,19 +1650,14 @@ def start_browser():
         options.add_argument("--disable-dev-shm-usage")
 
         # Define the path for the profile
-        user_data_dir = os.path.join(base_dir, "chrome_profiles")
-
-        # -------------------------- profiles here ---------------------------------
-        profile_dir = "profile_name_1" 
-        # profile_dir = "profile_name_2" 
-        # profile_dir = "profile_name_3" 
-        # profile_dir = "profile_name_4" 
-        # profile_dir = "profile_name_5" 
-        # profile_dir = "profile_name_6" 
-        # --------------------------------------------------------------------------
+        user_data_dir = _worker_user_data_dir(base_dir, worker_id)
 
         options.add_argument(f"--user-data-dir={user_data_dir}")
-        options.add_argument(f"--profile-directory={profile_dir}")
+        options.add_argument(f"--profile-directory={PROFILE_DIR}")
+        # Network events for the per-load request/blocked counts (navigation.py).
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        # When driver.get() returns; /navigate waits for its own page_load on top.
+        options.page_load_strategy = page_load
 
         # Create the user data directory if it doesn't exist
         if not os.path.exists(user_data_dir):
@@ -435,9 +1666,16 @@ def start_browser():
         return options
 
     # Priority 1: Try system Chrome auto-detection first.
+    system_chrome = _system_chrome_executable()
+    known_major = _cached_chrome_major(base_dir, system_chrome) if system_chrome else None
     try:
-        print("[Chrome] Trying system Chrome auto-detection...")
-        driver = uc.Chrome(options=build_options())
+        if known_major:
+            # Pin the driver to the browser up front; no mismatch retry needed.
+            print(f"[Chrome] Trying system Chrome auto-detection (version_main={known_major})...")
+            driver = uc.Chrome(options=build_options(), version_main=int(known_major))
+        else:
+            print("[Chrome] Trying system Chrome auto-detection...")
+            driver = uc.Chrome(options=build_options())
         print("[Chrome] Successfully using system Chrome")
         return driver
     except Exception as e:
@@ -447,11 +1685,13 @@ def start_browser():
         # If the failure is a Chrome/ChromeDriver major-version mismatch, retry
         # by pinning version_main to the detected browser major.
         guessed_major = _extract_current_browser_major_from_error(msg)
-        if guessed_major:
+        if guessed_major and guessed_major != known_major:
             try:
                 print(f"[Chrome] Retrying auto-detection with version_main={guessed_major}...")
                 driver = uc.Chrome(options=build_options(), version_main=int(guessed_major))
                 print(f"[Chrome] Successfully using system Chrome (version_main={guessed_major})")
+                if system_chrome:
+                    _remember_chrome_major(base_dir, system_chrome, guessed_major)
                 return driver
             except Exception as e2:
                 print(f"[Chrome] Auto-detection retry failed: {e2}")
@@ -460,7 +1700,7 @@ def start_browser():
 
     # Priority 2/3/4: repo chrome -> saved path -> prompt
     chrome_path = _resolve_chrome_executable(base_dir, prefer_auto=False)
-    chrome_major = _get_chrome_major_version(str(chrome_path))
+    chrome_major = _cached_chrome_major(base_dir, str(chrome_path))
     if chrome_major:
         print(f"[Chrome] Detected Chrome major version from binary: {chrome_major}")
     options = build_options()
@@ -513,17 +1753,79 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(add_help=True)
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="bot mode only: number of Chrome drivers in the pool",
+    )
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=1,
+        help="bot mode only: tabs per driver that /run_module jobs with a 'tab' key can lease "
+        "(keeps their pages apart; jobs on one driver still run one at a time)",
+    )
+    parser.add_argument(
+        "--attach",
+        action="store_true",
+        help="reuse the Chrome already running on our profile (remote debugging) instead of a cold start",
+    )
+    parser.add_argument(
+        "--debug-port",
+        type=int,
+        default=9222,
+        help="with --attach: remote-debugging port for a newly launched Chrome (+ worker index)",
+    )
+    parser.add_argument(
+        "--page-load",
+        choices=navigation.PAGE_LOAD_MODES,
+        default="normal",
+        help="session page-load strategy; 'none' lets /navigate return before the load event "
+        "(modules calling driver.get() directly then get no load wait)",
+    )
     args = parser.parse_args(argv)
 
-    kill_relevant_processes()
-
-    driver = start_browser()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    # Drivers of a crashed daemon are useless in either mode.
+    reap_orphaned_chromedrivers(base_dir)
+    if not args.attach:
+        # A leftover browser on our profile would make the cold start fail.
+        kill_relevant_processes(base_dir)
+
+    worker_count = max(1, args.workers) if bot_mode else 1
+    drivers = []
+    startup = []
     try:
+        for worker_id in range(worker_count):
+            if worker_count > 1:
+                print(f"[Chrome] Starting worker {worker_id + 1}/{worker_count}...")
+            info = {"worker": worker_id}
+            started = time.time()
+            if args.attach:
+                drivers.append(attach_browser(worker_id, debug_port=args.debug_port, info=info, page_load=args.page_load))
+            else:
+                drivers.append(start_browser(worker_id, info=info, page_load=args.page_load))
+            remember_chromedriver(base_dir, drivers[-1])
+            info["seconds"] = round(time.time() - started, 2)
+            startup.append(info)
+            print(f"[Chrome] Worker {worker_id} ready in {info['seconds']}s ({info['mode']})")
+
         if bot_mode:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            run_bot_api(driver, host=args.host, port=args.port, base_dir=base_dir)
+            run_bot_api(
+                drivers,
+                host=args.host,
+                port=args.port,
+                base_dir=base_dir,
+                tabs=max(1, args.tabs),
+                startup=startup,
+            )
         else:
-            control_browser(driver)
+            control_browser(drivers[0])
     finally:
-        driver.quit()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
@@ -16,12 +16,22 @@ import threading
 from flask_cors import CORS
 import os
 
+import dom_reduce
+import waits
+import dom_store
 
+DOM_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), dom_store.DEFAULT_DIR_NAME)
 
-def save_page_dom_to_file(driver, filename="page_dom.txt"):
+
+def save_page_dom_to_file(driver, filename="page_dom.txt", snapshot_dir=DOM_SNAPSHOT_DIR, reduce=None):
     """
     Extracts the full DOM (HTML source) of the current page and saves it to a text file.
     This includes all HTML elements as they appear in the browser's inspect window.
+    The file always holds the latest DOM; every snapshot is also kept, compressed
+    and deduplicated by content hash, in the snapshot store under snapshot_dir.
+    With reduce (True or {max_chars, max_tokens, keep_siblings}) an LLM-sized
+    copy is also written next to it, e.g. page_dom.reduced.txt.
+    Returns the snapshot info (snapshot_id, sizes, deduped).
     """
     try:
         # Get the entire page source (DOM)
@@ -35,6 +45,34 @@ def save_page_dom_to_file(driver, filename="page_dom.txt"):
         print(f"DOM saved successfully to {filename} (overwritten)")
         print(f"Total characters: {len(page_source)}")
         
+        result = {"page_dom_path": filename, "chars": len(page_source)}
+        if snapshot_dir:
+            snapshot = dom_store.open_store(snapshot_dir).save(
+                page_source,
+                url=driver.current_url,
+                title=driver.title,
+            )
+            status = "unchanged, deduplicated" if snapshot["deduped"] else "new"
+            print(f"Snapshot {snapshot['snapshot_id'][:12]} stored ({status}, {snapshot['stored_size']} bytes compressed)")
+            result.update(snapshot)
+        if reduce:
+            options = reduce if isinstance(reduce, dict) else {}
+            reduced = dom_reduce.reduce_html(
+                page_source,
+                max_chars=options.get("max_chars"),
+                max_tokens=options.get("max_tokens"),
+                keep_siblings=options.get("keep_siblings"),
+            )
+            reduced_filename = options.get("filename") or dom_reduce.reduced_path(filename)
+            with open(reduced_filename, 'w', encoding='utf-8') as file:
+                file.write(reduced["html"])
+            print(f"Reduced DOM saved to {reduced_filename} ({reduced['chars']} chars, ~{reduced['approx_tokens']} tokens)")
+            result["reduced"] = {
+                "path": reduced_filename,
+                **{k: v for k, v in reduced.items() if k != "html"},
+            }
+        return result
+        
     except Exception as e:
         print(f"Error extracting DOM: {str(e)}")
         raise Exception(f"Failed to save DOM: {str(e)}")
@@ -132,8 +170,10 @@ def extract_frais_livraison(driver):
             print(f"Selecting option {i}: '{wilaya_name}' with value: {wilaya_value}")
             
             # Click on the option directly
+            previous_frais = frais_input.get_attribute("value")
             current_option.click()
-            sleep(2)  # Wait for the page to update the frais
+            # Wait for the page to update the frais (at most the old 2s sleep)
+            waits.attribute_changed(driver, "[name='frais']", "value", previous=previous_frais, timeout=2)
             
             # Extract the frais value after selection
             frais_value = frais_input.get_attribute("value")
@@ -163,6 +203,10 @@ def main(driver, payload=None):
     """
     # extract_frais_livraison(driver)
     filename = "page_dom.txt"
+    snapshot_dir = DOM_SNAPSHOT_DIR
     if isinstance(payload, dict) and payload.get("filename"):
         filename = payload.get("filename")
-    save_page_dom_to_file(driver, filename=filename)
\ No newline at end of file
+    if isinstance(payload, dict) and payload.get("snapshot") is False:
+        snapshot_dir = None
+    reduce = payload.get("reduce") if isinstance(payload, dict) else None
+    return save_page_dom_to_file(driver, filename=filename, snapshot_dir=snapshot_dir, reduce=reduce)
\ No newline at end of file
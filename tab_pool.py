@@ -0,0 +1,216 @@
+import contextlib
+import threading
+import time
+
+import jobs
+import navigation
+
+
+_PENDING_NAV_JS = """
+var url = arguments[0];
+window.__bfPendingNav = true;
+setTimeout(function () { window.location.href = url; }, 0);
+"""
+
+_READY_STATE_JS = "return window.__bfPendingNav ? 'pending' : document.readyState;"
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class TabPool:
+    """
+    A set of window handles inside one Chrome instance.
+    Each tab is leased to one job at a time; the driver is switched to the
+    leased tab before the job runs and back to the home tab afterwards.
+    Leasing keeps jobs' pages apart but does not run them concurrently;
+    page loads overlap only inside map_urls.
+    """
+
+    def __init__(self, driver, size: int, include_current: bool = True):
+        self.driver = driver
+        self.home_handle = driver.current_window_handle
+        self.handles = [self.home_handle] if include_current else []
+        self._owned = set()
+        self._keys = {}
+        self._last_used = {}
+        while len(self.handles) < max(1, int(size)):
+            self._open_tab()
+        driver.switch_to.window(self.home_handle)
+
+    def _open_tab(self):
+        self.driver.switch_to.new_window("tab")
+        handle = self.driver.current_window_handle
+        self.handles.append(handle)
+        self._owned.add(handle)
+        return handle
+
+    def _prune_closed(self):
+        # Modules may close tabs themselves; replace whatever went missing.
+        alive = set(self.driver.window_handles)
+        if self.home_handle not in alive:
+            self.home_handle = self.driver.window_handles[0]
+        missing = [h for h in self.handles if h not in alive]
+        for handle in missing:
+            self.handles.remove(handle)
+            self._owned.discard(handle)
+            self._last_used.pop(handle, None)
+            for key in [k for k, h in self._keys.items() if h == handle]:
+                del self._keys[key]
+        for _ in missing:
+            self._open_tab()
+
+    def _pick(self, key=None):
+        if key is not None and key in self._keys:
+            return self._keys[key]
+        bound = set(self._keys.values())
+        free = [h for h in self.handles if h not in bound] or list(self.handles)
+        # Least recently used first, so unkeyed jobs spread over the tabs.
+        handle = min(free, key=lambda h: self._last_used.get(h, 0.0))
+        if key is not None:
+            for old_key in [k for k, h in self._keys.items() if h == handle]:
+                del self._keys[old_key]
+            self._keys[key] = handle
+        return handle
+
+    @contextlib.contextmanager
+    def lease(self, key=None):
+        """
+        Switches the driver to a tab for the duration of the block.
+        Jobs that pass the same key get the same tab (and its page state) back.
+        """
+        self._prune_closed()
+        handle = self._pick(key)
+        self.driver.switch_to.window(handle)
+        try:
+            yield handle
+        finally:
+            self._last_used[handle] = time.time()
+            try:
+                self.driver.switch_to.window(self.home_handle)
+            except Exception:
+                pass
+
+    def release(self, key):
+        self._keys.pop(key, None)
+
+    def stats(self):
+        return {
+            "tabs": len(self.handles),
+            "keys": dict(self._keys),
+        }
+
+    def close(self):
+        for handle in list(self._owned):
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception:
+                pass
+        self._owned.clear()
+        self.handles = [h for h in self.handles if h == self.home_handle]
+        try:
+            self.driver.switch_to.window(self.home_handle)
+        except Exception:
+            pass
+
+
+def pool_for(driver, size: int = 1):
+    """
+    Returns the shared TabPool of a driver, creating it on first use.
+    Must be called from the thread that owns the driver.
+    """
+    with _pools_lock:
+        pool = _pools.get(id(driver))
+        if pool is None or pool.driver is not driver:
+            pool = TabPool(driver, size)
+            _pools[id(driver)] = pool
+        return pool
+
+
+def start_navigation(driver, url: str):
+    """
+    Starts loading url in the current tab and returns immediately,
+    so other tabs can be driven while this one loads.
+    """
+    driver.execute_script(_PENDING_NAV_JS, url)
+
+
+def is_tab_ready(driver, ready_state: str = "complete"):
+    state = driver.execute_script(_READY_STATE_JS)
+    if ready_state == "interactive":
+        return state in ("interactive", "complete")
+    return state == "complete"
+
+
+def map_urls(driver, urls, fn, tabs: int = 3, timeout: float = 30.0, poll_interval: float = 0.2, ready_state: str = "complete", prepare=None):
+    """
+    Loads urls across `tabs` scratch tabs so their page loads overlap, and
+    runs fn(driver, url) in each tab as soon as its page is ready.
+    Yields (url, result, error) in completion order. urls is consumed
+    lazily, one URL whenever a tab frees up, so it may be a generator.
+    prepare(driver), if given, runs once in each scratch tab before its
+    first load (e.g. to apply a navigation profile).
+    The scratch tabs are closed and the driver is switched back to the
+    original tab at the end.
+    """
+    pending = iter(urls)
+    pool = TabPool(driver, tabs, include_current=False)
+    in_flight = {}
+
+    def load_next(handle):
+        url = next(pending, None)
+        if url is None:
+            return False
+        driver.switch_to.window(handle)
+        # Keep chromedriver's performance log from growing over the crawl.
+        navigation.begin(driver)
+        start_navigation(driver, url)
+        in_flight[handle] = (url, time.time())
+        return True
+
+    try:
+        if prepare is not None:
+            for handle in pool.handles:
+                driver.switch_to.window(handle)
+                prepare(driver)
+        for handle in pool.handles:
+            if not load_next(handle):
+                break
+
+        while in_flight:
+            jobs.check_cancelled()
+            progressed = False
+            for handle in list(in_flight):
+                url, started = in_flight[handle]
+                driver.switch_to.window(handle)
+                try:
+                    ready = is_tab_ready(driver, ready_state=ready_state)
+                except Exception:
+                    ready = False
+                if not ready and time.time() - started < timeout:
+                    continue
+
+                del in_flight[handle]
+                progressed = True
+                if not ready:
+                    yield url, None, Exception(f"Timed out loading {url} after {timeout}s")
+                else:
+                    try:
+                        result = fn(driver, url)
+                    except jobs.JobCancelled:
+                        raise
+                    except Exception as e:
+                        yield url, None, e
+                    else:
+                        yield url, result, None
+                load_next(handle)
+
+            if not progressed:
+                time.sleep(poll_interval)
+    finally:
+        pool.close()
+        try:
+            driver.switch_to.window(pool.home_handle)
+        except Exception:
+            pass
@@ -0,0 +1,333 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    visited INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    added_at REAL NOT NULL,
+    last_attempt_at REAL,
+    visited_at REAL
+);
+CREATE INDEX IF NOT EXISTS urls_visited ON urls(visited, id);
+"""
+
+# Crawl-runner columns, added to stores created before leasing existed.
+_LEASE_COLUMNS = (
+    ("lease_owner", "TEXT"),
+    ("lease_until", "REAL"),
+    ("next_attempt_at", "REAL NOT NULL DEFAULT 0"),
+    ("dead", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class UrlStore:
+    """
+    URL tracking table in SQLite (WAL): one row per URL with visit state,
+    attempt count and timestamps. Adding a batch is one transaction with a
+    unique index doing the dedup; marking a URL visited is one row update.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(urls)")}
+        for name, decl in _LEASE_COLUMNS:
+            if name not in existing:
+                self._db.execute(f"ALTER TABLE urls ADD COLUMN {name} {decl}")
+        self._db.commit()
+
+    def add(self, urls):
+        """Adds urls as unvisited, skipping known ones. Returns how many were new."""
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls (url, added_at) VALUES (?, ?)",
+                ((url, now) for url in urls),
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def mark_visited(self, url: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET visited = 1, visited_at = ?, last_error = NULL, "
+                "lease_owner = NULL, lease_until = NULL WHERE url = ?",
+                (now, url),
+            )
+            self._db.commit()
+
+    def record_attempt(self, url: str, error: str = None):
+        """Counts an attempt on url (and its error, if it failed)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET attempts = attempts + 1, last_attempt_at = ?, last_error = ? WHERE url = ?",
+                (time.time(), error, url),
+            )
+            self._db.commit()
+
+    def lease(self, owner: str, limit: int = 1, lease_seconds: float = 600.0):
+        """
+        Atomically hands up to `limit` due, unleased, unvisited URLs to owner.
+        A lease that is not completed or failed within lease_seconds
+        (crashed worker) lapses and the URL can be leased again.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, url FROM urls WHERE visited = 0 AND dead = 0 AND next_attempt_at <= ? "
+                    "AND (lease_until IS NULL OR lease_until < ?) ORDER BY id LIMIT ?",
+                    (now, now, int(limit)),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE urls SET lease_owner = ?, lease_until = ? WHERE id = ?",
+                    ((owner, now + lease_seconds, row[0]) for row in rows),
+                )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        return [row[1] for row in rows]
+
+    def fail(self, url: str, error: str, max_attempts: int = 4, backoff_base: float = 5.0, backoff_max: float = 300.0):
+        """
+        Records a failed attempt. The URL is retried after an exponential
+        backoff (base * 2^(attempts-1), capped), or parked as dead once it
+        has failed max_attempts times. Returns {"attempts", "dead", "retry_in"}.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            dead = attempts >= max_attempts
+            retry_in = 0.0 if dead else min(backoff_max, backoff_base * (2 ** (attempts - 1)))
+            self._db.execute(
+                "UPDATE urls SET attempts = ?, last_error = ?, last_attempt_at = ?, next_attempt_at = ?, "
+                "dead = ?, lease_owner = NULL, lease_until = NULL WHERE url = ?",
+                (attempts, error, now, now + retry_in, 1 if dead else 0, url),
+            )
+            self._db.commit()
+        return {"attempts": attempts, "dead": dead, "retry_in": retry_in}
+
+    def release(self, owner: str):
+        """Drops every lease held by owner (the URLs become available again)."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE urls SET lease_owner = NULL, lease_until = NULL WHERE lease_owner = ?",
+                (owner,),
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def reclaim_orphaned_leases(self):
+        """
+        Releases leases held by runners of this host whose process is gone,
+        so a restart after a crash resumes immediately instead of waiting
+        for the leases to lapse.
+        """
+        host = socket.gethostname()
+        with self._lock:
+            owners = [row[0] for row in self._db.execute(
+                "SELECT DISTINCT lease_owner FROM urls WHERE lease_owner IS NOT NULL"
+            )]
+        released = 0
+        for owner in owners:
+            parts = owner.split(":")
+            if len(parts) < 2 or parts[0] != host or not parts[1].isdigit():
+                continue
+            if not _pid_alive(int(parts[1])):
+                released += self.release(owner)
+        return released
+
+    def next_due_in(self):
+        """
+        Seconds until the next pending URL can be leased (0 if one is due now),
+        or None when nothing is left for this runner. URLs currently leased
+        by another live runner are theirs and don't count.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM urls WHERE visited = 0 AND dead = 0 "
+                "AND (lease_until IS NULL OR lease_until < ?)",
+                (now,),
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - now)
+
+    def dead_letters(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, attempts, last_error, last_attempt_at FROM urls WHERE dead = 1 ORDER BY id"
+            ).fetchall()
+        return [
+            {"url": url, "attempts": attempts, "last_error": error, "last_attempt_at": at}
+            for url, attempts, error, at in rows
+        ]
+
+    def requeue_dead(self):
+        """Gives dead-lettered URLs a fresh set of attempts."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE urls SET dead = 0, attempts = 0, next_attempt_at = 0 WHERE dead = 1"
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def unvisited(self, limit: int = None):
+        query = "SELECT url FROM urls WHERE visited = 0 AND dead = 0 ORDER BY id"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (int(limit),)
+        with self._lock:
+            return [row[0] for row in self._db.execute(query, params)]
+
+    def get(self, url: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, visited, attempts, last_error, added_at, last_attempt_at, visited_at "
+                "FROM urls WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "url": row[0],
+            "visited": bool(row[1]),
+            "attempts": row[2],
+            "last_error": row[3],
+            "added_at": row[4],
+            "last_attempt_at": row[5],
+            "visited_at": row[6],
+        }
+
+    def counts(self):
+        with self._lock:
+            total, visited, dead, leased = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(visited), 0), COALESCE(SUM(dead), 0), "
+                "COALESCE(SUM(lease_until IS NOT NULL AND lease_until >= ?), 0) FROM urls",
+                (time.time(),),
+            ).fetchone()
+        return {
+            "total": total,
+            "visited": visited,
+            "unvisited": total - visited - dead,
+            "dead": dead,
+            "leased": leased,
+        }
+
+    def import_json(self, filename: str):
+        """
+        Merges a {"urls": [{"url", "visited"}]} tracking file into the store.
+        URLs visited in the file are marked visited here too.
+        """
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = data.get("urls") if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            raise Exception(f"{filename} has no 'urls' list")
+        now = time.time()
+        rows = [item for item in items if isinstance(item, dict) and item.get("url")]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls (url, added_at) VALUES (?, ?)",
+                ((item["url"], now) for item in rows),
+            )
+            added = self._db.total_changes - before
+            self._db.executemany(
+                "UPDATE urls SET visited = 1, visited_at = COALESCE(visited_at, ?) WHERE url = ? AND visited = 0",
+                ((now, item["url"]) for item in rows if item.get("visited")),
+            )
+            self._db.commit()
+        return {"imported": len(rows), "added": added}
+
+    def export_json(self, filename: str):
+        """Writes the store in the {"urls": [{"url", "visited"}]} layout (atomically)."""
+        with self._lock:
+            rows = self._db.execute("SELECT url, visited FROM urls ORDER BY id").fetchall()
+        data = {"urls": [{"url": url, "visited": bool(visited)} for url, visited in rows]}
+        tmp_path = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, filename)
+        return len(rows)
+
+    def export_dead_letters(self, filename: str):
+        """Writes the dead-lettered URLs as {"dead": [...]} (atomically)."""
+        dead = self.dead_letters()
+        tmp_path = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dead": dead}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, filename)
+        return len(dead)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _pid_alive(pid: int):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else (EPERM), or the check isn't supported.
+        return True
+    return True
+
+
+def open_store(path: str):
+    """Returns the shared UrlStore for path, opening it on first use."""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = UrlStore(path)
+            _stores[path] = store
+        return store
+
+
+def store_path_for(json_filename: str):
+    """product_urls.json -> product_urls.sqlite3"""
+    return os.path.splitext(json_filename)[0] + ".sqlite3"
+
+
+def open_for_json(json_filename: str):
+    """
+    Opens the store that replaces a JSON tracking file. The first time,
+    the existing JSON file is imported into it.
+    """
+    db_path = store_path_for(json_filename)
+    is_new = not os.path.exists(db_path)
+    store = open_store(db_path)
+    if is_new and os.path.exists(json_filename):
+        result = store.import_json(json_filename)
+        print(f"Imported {result['imported']} URL(s) from {json_filename} into {db_path}")
+    return store
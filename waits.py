@@ -0,0 +1,335 @@
+import inspect
+import threading
+
+
+# Counts in-flight fetch/XHR requests and the time of the last network activity.
+_TRACKER_FN_JS = """
+function installTracker() {
+  if (window.__bfNet) { return; }
+  var net = window.__bfNet = {inflight: 0, last: Date.now()};
+  function start() { net.inflight += 1; net.last = Date.now(); }
+  function end() { net.inflight = Math.max(0, net.inflight - 1); net.last = Date.now(); }
+  if (window.fetch) {
+    var origFetch = window.fetch;
+    window.fetch = function () {
+      start();
+      return origFetch.apply(this, arguments).then(
+        function (r) { end(); return r; },
+        function (e) { end(); throw e; }
+      );
+    };
+  }
+  var origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    start();
+    this.addEventListener('loadend', end, {once: true});
+    return origSend.apply(this, arguments);
+  };
+  try {
+    new PerformanceObserver(function () { net.last = Date.now(); }).observe({type: 'resource'});
+  } catch (e) {}
+  var entries = performance.getEntriesByType('resource');
+  if (entries.length) {
+    net.last = Math.min(net.last, performance.timeOrigin + entries[entries.length - 1].responseEnd);
+  }
+}
+"""
+
+_NETWORK_TRACKER_JS = _TRACKER_FN_JS + "installTracker();\n"
+
+# One execute_async_script call per wait: the condition is polled inside the page.
+_WAIT_JS = _TRACKER_FN_JS + """
+var kind = arguments[0], opts = arguments[1], done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function finish(ok, extra) {
+  var result = extra || {};
+  result.ok = ok;
+  result.kind = kind;
+  result.waited_ms = Date.now() - started;
+  done(result);
+}
+
+function count(sel) {
+  try { return document.querySelectorAll(sel).length; } catch (e) { return -1; }
+}
+
+function read(sel, attr) {
+  var el = document.querySelector(sel);
+  if (!el) { return null; }
+  if (attr === 'value') { return el.value; }
+  if (attr === 'text') { return (el.innerText || el.textContent || '').trim(); }
+  return el.getAttribute(attr);
+}
+
+var check, cleanup = function () {};
+if (kind === 'dom_quiet') {
+  var lastMutation = Date.now();
+  var observer = new MutationObserver(function () { lastMutation = Date.now(); });
+  observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+  cleanup = function () { observer.disconnect(); };
+  check = function (now) {
+    return document.readyState !== 'loading' && now - lastMutation >= opts.quiet_ms ? {} : null;
+  };
+} else if (kind === 'network_idle') {
+  installTracker();
+  check = function (now) {
+    var net = window.__bfNet;
+    if (net.inflight > 0 || now - net.last < opts.idle_ms) { return null; }
+    return {inflight: net.inflight};
+  };
+} else if (kind === 'element_count_stable') {
+  var lastCount = count(opts.selector), changedAt = Date.now();
+  check = function (now) {
+    var c = count(opts.selector);
+    if (c !== lastCount) { lastCount = c; changedAt = now; return null; }
+    return c >= opts.min_count && now - changedAt >= opts.stable_ms ? {count: c} : null;
+  };
+} else if (kind === 'attribute_changed') {
+  var previous = opts.has_previous ? opts.previous : read(opts.selector, opts.attribute);
+  check = function () {
+    var value = read(opts.selector, opts.attribute);
+    return value !== previous ? {value: value, previous: previous} : null;
+  };
+} else if (kind === 'selector') {
+  check = function () {
+    var c = count(opts.selector);
+    return c >= (opts.min_count || 1) ? {count: c} : null;
+  };
+} else {
+  return finish(false, {error: 'unknown wait kind ' + kind});
+}
+
+(function poll() {
+  var now = Date.now(), met = check(now);
+  if (met) { cleanup(); return finish(true, met); }
+  if (now - started >= opts.timeout_ms) { cleanup(); return finish(false); }
+  setTimeout(poll, opts.poll_ms || 50);
+})();
+"""
+
+# Polls every locator together and resolves with the first (in list order) that matches.
+_FIRST_OF_JS = """
+var locators = arguments[0], timeoutMs = arguments[1], pollMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function locate(loc) {
+  var by = loc[0], value = loc[1];
+  if (by === 'xpath') {
+    return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  }
+  if (by === 'css selector') { return document.querySelector(value); }
+  if (by === 'id') { return document.getElementById(value); }
+  if (by === 'name') { return document.querySelector('[name="' + CSS.escape(value) + '"]'); }
+  if (by === 'tag name') { return document.getElementsByTagName(value)[0] || null; }
+  if (by === 'class name') { return document.getElementsByClassName(value)[0] || null; }
+  throw new Error('unsupported locator strategy ' + by);
+}
+
+(function poll() {
+  for (var i = 0; i < locators.length; i++) {
+    var el = null;
+    try { el = locate(locators[i]); } catch (e) { return done({index: -1, error: String(e.message || e)}); }
+    if (el) { return done({index: i, element: el, waited_ms: Date.now() - started}); }
+  }
+  if (Date.now() - started >= timeoutMs) { return done({index: -1, waited_ms: Date.now() - started}); }
+  setTimeout(poll, pollMs);
+})();
+"""
+
+_UNSET = object()
+
+WAIT_KINDS = ("dom_quiet", "network_idle", "element_count_stable", "attribute_changed", "selector")
+
+_script_timeouts = {}
+_trackers = set()
+_lock = threading.Lock()
+
+
+def ensure_script_timeout(driver, seconds: float):
+    # Only widen the session's script timeout; each change is a round trip.
+    with _lock:
+        if _script_timeouts.get(id(driver), 0) >= seconds:
+            return
+        _script_timeouts[id(driver)] = seconds
+    driver.set_script_timeout(seconds)
+
+
+def _run(driver, kind: str, timeout: float, **opts):
+    opts["timeout_ms"] = int(float(timeout) * 1000)
+    ensure_script_timeout(driver, float(timeout) + 10)
+    return driver.execute_async_script(_WAIT_JS, kind, opts)
+
+
+def install_network_tracker(driver):
+    """
+    Registers the fetch/XHR tracker for every new document of this driver
+    (via CDP), so network_idle also sees requests made during page load.
+    Without it the tracker is injected on the first network_idle call.
+    CDP scripts belong to one tab, so each tab is registered apart.
+    """
+    key = (id(driver), driver.current_window_handle)
+    with _lock:
+        if key in _trackers:
+            return True
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _NETWORK_TRACKER_JS})
+    except Exception as e:
+        print(f"[waits] Could not register network tracker: {e}")
+        return False
+    with _lock:
+        _trackers.add(key)
+    return True
+
+
+def dom_quiet(driver, quiet_ms: int = 500, timeout: float = 10.0):
+    """Waits until the page has stopped mutating for quiet_ms."""
+    return _run(driver, "dom_quiet", timeout, quiet_ms=int(quiet_ms))
+
+
+def network_idle(driver, idle_ms: int = 500, timeout: float = 10.0):
+    """Waits until no fetch/XHR is in flight and nothing loaded for idle_ms."""
+    return _run(driver, "network_idle", timeout, idle_ms=int(idle_ms))
+
+
+def element_count_stable(driver, selector: str, stable_ms: int = 500, min_count: int = 1, timeout: float = 10.0):
+    """Waits until at least min_count elements match and the count holds for stable_ms."""
+    return _run(
+        driver,
+        "element_count_stable",
+        timeout,
+        selector=selector,
+        stable_ms=int(stable_ms),
+        min_count=int(min_count),
+    )
+
+
+def attribute_changed(driver, selector: str, attribute: str = "value", previous=_UNSET, timeout: float = 10.0):
+    """
+    Waits until an attribute ('value' and 'text' read the property / text)
+    of the first match differs from previous. Without previous, the value
+    at call time is the baseline; use read_attribute() before triggering
+    the change if the page may update quickly.
+    """
+    return _run(
+        driver,
+        "attribute_changed",
+        timeout,
+        selector=selector,
+        attribute=attribute,
+        previous=None if previous is _UNSET else previous,
+        has_previous=previous is not _UNSET,
+    )
+
+
+def element_present(driver, selector: str, min_count: int = 1, timeout: float = 10.0):
+    return _run(driver, "selector", timeout, selector=selector, min_count=int(min_count))
+
+
+def read_attribute(driver, selector: str, attribute: str = "value"):
+    """Reads a baseline for attribute_changed, with the same semantics."""
+    return driver.execute_script(
+        """
+        var el = document.querySelector(arguments[0]), attr = arguments[1];
+        if (!el) { return null; }
+        if (attr === 'value') { return el.value; }
+        if (attr === 'text') { return (el.innerText || el.textContent || '').trim(); }
+        return el.getAttribute(attr);
+        """,
+        selector,
+        attribute,
+    )
+
+
+def wait_for_first(driver, locators, timeout: float = 10.0, poll_ms: int = 100):
+    """
+    Waits for the first of several locators to match, polling them all in
+    one in-page call. locators are (By, value) tuples (or CSS strings) in
+    order of preference; when several match at once the earliest wins.
+    Returns (index, element). Raises if none matched within timeout, like
+    WebDriverWait would for a single locator.
+    """
+    normalized = [
+        ["css selector", loc] if isinstance(loc, str) else [loc[0], loc[1]]
+        for loc in locators
+    ]
+    ensure_script_timeout(driver, float(timeout) + 10)
+    result = driver.execute_async_script(_FIRST_OF_JS, normalized, int(float(timeout) * 1000), int(poll_ms))
+    if result.get("error"):
+        raise Exception(f"wait_for_first: {result['error']}")
+    if result.get("index", -1) < 0:
+        tried = ", ".join(value for _, value in normalized)
+        raise Exception(f"None of [{tried}] matched within {timeout}s")
+    return result["index"], result["element"]
+
+
+_WAITERS = {
+    "dom_quiet": dom_quiet,
+    "network_idle": network_idle,
+    "element_count_stable": element_count_stable,
+    "attribute_changed": attribute_changed,
+    "selector": element_present,
+}
+
+
+# Options that must be non-negative numbers (ms, counts, seconds).
+_NUMERIC_OPTIONS = ("timeout", "quiet_ms", "idle_ms", "stable_ms", "min_count", "poll_ms")
+_STRING_OPTIONS = ("selector", "attribute")
+
+
+def _option_names(kind: str):
+    # Keyword arguments of the waiter, i.e. the options a spec may carry.
+    return set(inspect.signature(_WAITERS[kind]).parameters) - {"driver"}
+
+
+def validate_spec(spec):
+    """Returns an error message for an invalid wait_for spec, or None."""
+    specs = spec if isinstance(spec, list) else [spec]
+    for item in specs:
+        kind = item if isinstance(item, str) else (item or {}).get("type") if isinstance(item, dict) else None
+        if kind not in _WAITERS:
+            return f"Unknown wait_for type {kind!r} (expected one of {', '.join(WAIT_KINDS)})"
+        if kind in ("element_count_stable", "attribute_changed", "selector") and not (
+            isinstance(item, dict) and item.get("selector")
+        ):
+            return f"wait_for type {kind!r} needs a 'selector'"
+        if isinstance(item, dict):
+            allowed = _option_names(kind)
+            unknown = sorted(set(item) - allowed - {"type"})
+            if unknown:
+                return (
+                    f"wait_for type {kind!r}: unknown option(s) {', '.join(unknown)} "
+                    f"(expected {', '.join(sorted(allowed))})"
+                )
+            for name, value in item.items():
+                if name in _NUMERIC_OPTIONS and (
+                    isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0
+                ):
+                    return f"wait_for type {kind!r}: {name!r} must be a non-negative number"
+                if name in _STRING_OPTIONS and not (isinstance(value, str) and value.strip()):
+                    return f"wait_for type {kind!r}: {name!r} must be a non-empty string"
+    return None
+
+
+def spec_kinds(spec):
+    """The condition types of a validated wait_for spec, in order."""
+    return [item if isinstance(item, str) else item["type"] for item in (spec if isinstance(spec, list) else [spec])]
+
+
+def wait_for(driver, spec, timeout: float = 10.0):
+    """
+    Runs one wait spec or a list of them in order. A spec is a kind name
+    ("dom_quiet", "network_idle") or a dict {"type": kind, ...options}.
+    Returns the list of wait results.
+    """
+    error = validate_spec(spec)
+    if error:
+        raise Exception(error)
+    results = []
+    for item in spec if isinstance(spec, list) else [spec]:
+        options = {"type": item} if isinstance(item, str) else dict(item)
+        kind = options.pop("type")
+        options.setdefault("timeout", timeout)
+        results.append(_WAITERS[kind](driver, **options))
+    return results